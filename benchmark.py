@@ -0,0 +1,76 @@
+"""Per-recipient chat navigation latency: in-app routing versus full page reload.
+
+Opens the chat for every phone number in a text file (one per line) with each
+navigation mode and prints latency statistics. No messages are sent.
+
+    python benchmark.py --webdriver chromedriver.exe --phones phones.txt
+"""
+import argparse
+import os
+import statistics
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from locators import LANGUAGES
+from sender import WHATSAPP_URL, WhatsAppSender, launch_driver
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def benchmark_navigation(driver, phones, navigation, language="auto", base_url=WHATSAPP_URL):
+    sender = WhatsAppSender(driver, language=language, navigation=navigation, base_url=base_url)
+    latencies = []
+    failures = 0
+    for phone_number in phones:
+        started = time.perf_counter()
+        message_box = sender.open_chat(phone_number)
+        if message_box is None:
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    return latencies, failures
+
+
+def print_report(navigation, latencies, failures):
+    if not latencies:
+        print(f"{navigation:>7}: no chat opened ({failures} failures)")
+        return
+    print(
+        f"{navigation:>7}: n={len(latencies)} mean={statistics.mean(latencies):.3f}s "
+        f"p50={percentile(latencies, 0.50):.3f}s p95={percentile(latencies, 0.95):.3f}s "
+        f"max={max(latencies):.3f}s failures={failures}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--webdriver", required=True, help="Path to chromedriver")
+    parser.add_argument("--profile", default=os.path.join(os.getcwd(), "whatsapp_session"), help="Logged-in Chrome profile directory")
+    parser.add_argument("--phones", required=True, help="Text file with one phone number per line")
+    parser.add_argument("--language", default="auto", choices=LANGUAGES)
+    parser.add_argument("--base-url", default=WHATSAPP_URL, help="e.g. a mockwhatsapp.py server")
+    args = parser.parse_args()
+
+    with open(args.phones) as f:
+        phones = [line.strip() for line in f if line.strip()]
+
+    driver = launch_driver(args.webdriver, args.profile)
+    try:
+        driver.get(args.base_url)
+        # Wait for the chat list so the first fast-mode navigation has a loaded app
+        WebDriverWait(driver, 120).until(EC.presence_of_element_located((By.ID, "pane-side")))
+        for navigation in ("reload", "fast"):
+            latencies, failures = benchmark_navigation(driver, phones, navigation, args.language, args.base_url)
+            print_report(navigation, latencies, failures)
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Run a WhatsApp campaign without the GUI, e.g. unattended from cron on a Linux server.
+
+    python cli.py --input contacts.csv --sessions 2 --rate 20
+    python cli.py --input contacts.xlsx --resume --mode photo --photo offer.png
+
+Chrome runs headless by default. A session that is not logged in yet gets a
+screenshot of its QR code saved next to the reports; scan it with the phone
+and the run continues. The exit code is 0 when every session finished, 1 when
+the run was stopped or a session died, and 2 when no session could start.
+"""
+import argparse
+import os
+import signal
+import sys
+
+from engine import Campaign
+from eventlog import EventLog
+from journal import ResultJournal
+from metrics import MetricsExporter
+from pacing import DEFAULT_RATE, FIXED_DELAY, PACERS
+from pool import WorkerPool
+from templates import TemplateError, load_template
+from locators import LANGUAGES
+from sender import STATUS_TIMEOUT
+
+
+def positive_float(value):
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be above 0, got {value}")
+    return number
+
+
+def non_negative_float(value):
+    number = float(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative, got {value}")
+    return number
+
+
+def add_session_arguments(parser):
+    parser.add_argument("--output-dir", default=".", help="Directory for sent/unsent reports, journal and log")
+    parser.add_argument("--webdriver", help="Path to chromedriver (default: let Selenium locate it)")
+    parser.add_argument("--profile-dir", help="Directory holding the Chrome profiles (default: current directory)")
+    parser.add_argument("--sessions", type=int, default=1, help="Number of parallel browser sessions")
+    parser.add_argument("--no-headless", dest="headless", action="store_false", help="Show the browser windows")
+    parser.add_argument("--metrics-file", help="Rewrite phase timings here every few seconds (.json for JSON, "
+                                               "anything else for Prometheus text)")
+    parser.add_argument("--metrics-port", type=int, help="Serve /metrics and /metrics.json on this local port")
+    parser.add_argument("--login-timeout", type=int, default=300, help="Seconds to wait for each session to be logged in")
+
+
+def add_message_arguments(parser):
+    parser.add_argument("--template", help="Message template file with {column} placeholders")
+    parser.add_argument("--phone-column", help="Column holding the phone number (default: the first column)")
+    parser.add_argument("--country-code", help="Country code added to national numbers, e.g. 966")
+    parser.add_argument("--attachment-column",
+                        help="Column with files to send per row, separated by ';' (images, PDFs, ...)")
+    parser.add_argument("--mode", choices=["message", "photo"], default="message")
+    parser.add_argument("--photo", default="", help="Image sent to every row in photo mode")
+    parser.add_argument("--photo-max-dimension", type=int, help="Downscale the photo so its longest side fits")
+    parser.add_argument("--language", choices=LANGUAGES, default="auto",
+                        help="WhatsApp Web UI language (default: detect it after login)")
+    parser.add_argument("--pacing", choices=[*PACERS, "fixed"], default="adaptive")
+    parser.add_argument("--delay", type=non_negative_float, default=FIXED_DELAY, help="Seconds between recipients with --pacing fixed")
+    parser.add_argument("--pipelined", action="store_true", help="Verify delivery in batches instead of after every send")
+    parser.add_argument("--navigation", choices=["fast", "reload"], default="fast")
+    parser.add_argument("--status-timeout", type=int, default=STATUS_TIMEOUT)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", required=True, help="Contact file (.xlsx, .csv or .jsonl)")
+    add_session_arguments(parser)
+    add_message_arguments(parser)
+    parser.add_argument("--validate", action="store_true",
+                        help="Render every row and check for empty template fields and bad phone numbers before sending")
+    parser.add_argument("--rate", type=positive_float, default=DEFAULT_RATE, help="Maximum messages per minute per session")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint of this input file")
+    return parser.parse_args(argv)
+
+
+def sender_settings(args):
+    """WhatsAppSender keyword arguments from the add_message_arguments options."""
+    return {
+        "language": args.language,
+        "send_mode": args.mode,
+        "photo_path": os.path.abspath(args.photo) if args.photo else "",
+        "photo_max_dimension": args.photo_max_dimension,
+        "navigation": args.navigation,
+        "status_timeout": args.status_timeout,
+    }
+
+
+def country_code(args):
+    return args.country_code.lstrip("+") if args.country_code else None
+
+
+def log_in(pool, args, log, output):
+    """Launch every session and wait for it to be logged in; False when none is."""
+    pool.open_sessions()
+    for worker in pool.active_workers():
+        if not worker.wait_for_login(args.login_timeout, output(f"login_session_{worker.index + 1}.png")):
+            log(f"{worker.name}: not logged in after {args.login_timeout}s; leaving it out.")
+            worker.close()
+    if not pool.active_workers():
+        log("No logged-in session available.")
+        return False
+    return True
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    output = lambda name: os.path.join(args.output_dir, name)
+
+    events = EventLog(output("log.txt"), gui=False)
+
+    def log(message):
+        print(message, flush=True)
+        events.emit(message)
+
+    journal = ResultJournal(output("results_journal.db"))
+    try:
+        template = load_template(args.template) if args.template else None
+        campaign = Campaign(args.input, journal, log=log, template=template, phone_column=args.phone_column,
+                            country_code=country_code(args), attachment_column=args.attachment_column)
+        # Template and phone number problems are reported before any browser is launched
+        blank_rows = campaign.validate(scan_rows=args.validate, resume=args.resume)
+        if blank_rows:
+            log("Fix the rows reported above before sending.")
+    except (TemplateError, OSError, ValueError) as e:
+        log(f"Pre-flight check failed: {str(e)}")
+        blank_rows = None
+    if blank_rows != 0:
+        journal.close()
+        events.close()
+        return 2
+    pool = WorkerPool(args.webdriver, args.sessions, journal, log=log, headless=args.headless,
+                      profile_root=args.profile_dir)
+
+    # SIGTERM (e.g. from a cron timeout) stops after the in-flight recipients so the checkpoint stays exact
+    signal.signal(signal.SIGTERM, lambda signum, frame: pool.stop())
+
+    try:
+        if not log_in(pool, args, log, output):
+            return 2
+        settings = sender_settings(args)
+
+        def on_outcome(row_id, status):
+            if campaign.done % 25 == 0:
+                progress_value, remaining_time = campaign.progress()
+                eta = f", about {str(remaining_time).split('.')[0]} left" if progress_value is not None else ""
+                log(f"{campaign.done} done ({campaign.recipients.sent} sent){eta}. {pool.pacing_summary()}")
+                log(pool.metrics.describe())
+
+        exporter = MetricsExporter(pool.metrics, path=args.metrics_file, port=args.metrics_port).start()
+        log(f"Started sending messages from {args.input}...")
+        try:
+            pacing = {"mode": args.pacing, "rate": args.rate, "delay": args.delay}
+            campaign.run(pool, settings, resume=args.resume, pipelined=args.pipelined, pacing=pacing,
+                         on_outcome=on_outcome)
+        except KeyboardInterrupt:
+            pool.stop()
+            pool.wait()
+            log("Interrupted; run again with --resume to continue.")
+        finally:
+            exporter.stop()
+            sent_count, unsent_count, unconfirmed_count = campaign.export_reports(
+                output("sent_messages.xlsx"), output("unsent_messages.xlsx"), output("unconfirmed_messages.xlsx"))
+            log(f"Finished: {sent_count} sent, {unsent_count} unsent.")
+            if unconfirmed_count:
+                log(f"{unconfirmed_count} submitted messages were never confirmed; "
+                    "check unconfirmed_messages.xlsx before sending them again.")
+
+        finished = all(health["state"] == "finished" for health in pool.health() if health["state"] != "closed")
+        return 0 if finished and not pool.stop_requested else 1
+    finally:
+        pool.close()
+        journal.close()
+        events.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import csv
+import json
+import os
+import re
+import zipfile
+
+import openpyxl
+
+from journal import source_fingerprint
+
+
+SAMPLE_BYTES = 64 * 1024
+
+# Start tag of a row in the sheet XML, with or without a namespace prefix
+ROW_TAG = re.compile(rb"<(?:\w+:)?row[\s>]")
+
+
+class ContactSource:
+    """Streams contact rows from an .xlsx, .csv or .jsonl file.
+
+    Iterating yields (row_id, values) tuples lazily, where row_id follows the
+    spreadsheet numbering (header on row 1, first contact on row 2) whatever the
+    file type. Nothing beyond the current row is held in memory.
+
+    To resume, pass start_row and, for CSV/JSONL, the start_offset recorded at
+    the checkpoint: the text readers seek straight there and xlsx starts its
+    row iterator at start_row. After each row, offset holds the byte position
+    just past it (None for xlsx).
+    """
+
+    def __init__(self, path, start_row=2, start_offset=None):
+        self.path = path
+        self.kind = os.path.splitext(path)[1].lower().lstrip(".")
+        if self.kind not in ("xlsx", "csv", "jsonl"):
+            raise ValueError(f"Unsupported contact file type: {path}")
+        self.header = ()
+        self.start_row = start_row
+        self.start_offset = start_offset
+        self.offset = None
+        self._workbook = None
+
+    def __iter__(self):
+        if self.kind == "xlsx":
+            return self._iter_xlsx()
+        if self.kind == "csv":
+            return self._iter_csv()
+        return self._iter_jsonl()
+
+    @property
+    def fingerprint(self):
+        """(size, mtime_ns) of the file, stored with checkpoints to detect edits before a resume."""
+        return source_fingerprint(self.path)
+
+    def _open_workbook(self):
+        if self._workbook is None:
+            self._workbook = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        return self._workbook
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+
+    def _iter_xlsx(self):
+        wb = self._open_workbook()
+        try:
+            sheet = wb.active
+            self.header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+            rows = sheet.iter_rows(min_row=self.start_row, values_only=True)
+            for row_id, values in enumerate(rows, start=self.start_row):
+                # Read-only sheets can report trailing formatted-but-empty rows
+                if any(value is not None for value in values):
+                    yield row_id, values
+        finally:
+            self.close()
+
+    @staticmethod
+    def _lines(f):
+        # Binary readline keeps f.tell() cheap and exact after every record
+        for line in iter(f.readline, b""):
+            yield line.decode("utf-8-sig")
+
+    def _iter_csv(self):
+        with open(self.path, "rb") as f:
+            reader = csv.reader(self._lines(f))
+            self.header = tuple(next(reader, ()))
+            start_row = 2
+            if self.start_offset is not None:
+                f.seek(self.start_offset)
+                start_row = self.start_row
+            for row_id, values in enumerate(reader, start=start_row):
+                self.offset = f.tell()
+                if values:
+                    yield row_id, tuple(values)
+
+    def _iter_jsonl(self):
+        with open(self.path, "rb") as f:
+            start_row = 2
+            if self.start_offset is not None:
+                # Resumed rows must be laid out under the same header as the first record
+                for line in self._lines(f):
+                    if line.strip():
+                        record = json.loads(line)
+                        if isinstance(record, dict):
+                            self.header = tuple(record)
+                        break
+                f.seek(self.start_offset)
+                start_row = self.start_row
+            for row_id, line in enumerate(self._lines(f), start=start_row):
+                self.offset = f.tell()
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    if not self.header:
+                        self.header = tuple(record)
+                    yield row_id, tuple(record.get(key) for key in self.header)
+                else:
+                    yield row_id, tuple(record)
+
+    def read_header(self):
+        """Return the column names without streaming the rest of the file."""
+        if self.kind == "xlsx":
+            if not self.header:
+                sheet = self._open_workbook().active
+                self.header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+            return self.header
+        source = ContactSource(self.path)
+        rows = iter(source)
+        next(rows, None)
+        rows.close()
+        return source.header
+
+    def first_row(self):
+        """Return (row_id, values) of the first contact row, or None, without streaming the rest."""
+        if self.kind == "xlsx":
+            sheet = self._open_workbook().active
+            for row_id, values in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+                if any(value is not None for value in values):
+                    return row_id, values
+            return None
+        rows = iter(ContactSource(self.path))
+        first = next(rows, None)
+        rows.close()
+        return first
+
+    def estimate_total(self):
+        """Cheap estimate of the number of contact rows, or None if unknown.
+
+        xlsx uses the sheet dimension recorded in the file, or extrapolates from
+        the rows in the first 64 KB of the sheet XML when the writer left the
+        dimension out; text formats extrapolate from the average line length of
+        the first 64 KB.
+        """
+        if self.kind == "xlsx":
+            keep_open = self._workbook is not None
+            sheet = self._open_workbook().active
+            try:
+                if sheet.max_row:
+                    return sheet.max_row - 1
+                # Only the zip directory and the start of the sheet are read here
+                with zipfile.ZipFile(self.path) as archive:
+                    info = archive.getinfo(sheet._worksheet_path)
+                    with archive.open(info) as f:
+                        sample = f.read(SAMPLE_BYTES)
+                return self._extrapolate(len(ROW_TAG.findall(sample)), len(sample), info.file_size, header=True)
+            finally:
+                if not keep_open:
+                    self.close()
+
+        size = os.path.getsize(self.path)
+        with open(self.path, "rb") as f:
+            sample = f.read(SAMPLE_BYTES)
+        lines = sample.count(b"\n")
+        if len(sample) < SAMPLE_BYTES and sample and not sample.endswith(b"\n"):
+            lines += 1
+        return self._extrapolate(lines, len(sample), size, header=self.kind == "csv")
+
+    @staticmethod
+    def _extrapolate(records, sample_size, size, header):
+        if sample_size < SAMPLE_BYTES:
+            total = records
+        elif records:
+            total = int(size / (sample_size / records))
+        else:
+            return None
+        if header:
+            total -= 1
+        return max(total, 0)
@@ -0,0 +1,262 @@
+import os
+import re
+from datetime import datetime, timedelta
+
+from contacts import ContactSource
+from journal import CheckpointMismatch, RecipientStatus, campaign_id, source_fingerprint
+from phones import DUPLICATE, INVALID, PhoneFilter, RejectedNumber
+from templates import TemplateError
+
+
+# Separators between several attachment paths in one cell
+ATTACHMENT_SEPARATORS = re.compile(r"[;|\n]")
+
+
+class Campaign:
+    """Runs one contact file through a WorkerPool, independent of any GUI.
+
+    Both the Tk app and the command line drive sending through this class; they
+    only differ in the log/info callbacks they pass and how they show progress.
+    """
+
+    def __init__(self, filepath, journal, log=None, info=None, template=None, phone_column=None,
+                 country_code=None, attachment_column=None):
+        self.filepath = filepath
+        self.template = template
+        self.phone_column = phone_column
+        self.attachment_column = attachment_column
+        self.country_code = country_code
+        self.phones = PhoneFilter(country_code)
+        self.journal = journal
+        self.id = campaign_id(filepath)
+        self.log = log or (lambda message: None)
+        self.info = info or (lambda message: None)
+        self.recipients = RecipientStatus()
+        self.total_rows = None
+        self.start_time = None
+        self.metrics = None
+        self.source = None
+
+    def load(self):
+        """Rebuild recipient statuses from the journal, e.g. to export reports of an earlier run."""
+        self.recipients = self.journal.load_status(self.id)
+        return self
+
+    def contact_source(self):
+        """The source the next run iterates; opened once so validate() and run() share the workbook."""
+        if self.source is None:
+            self.source = ContactSource(self.filepath)
+        return self.source
+
+    def close_source(self):
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+    def load_checkpoint(self):
+        """Return this file's checkpoint, or None; raises CheckpointMismatch if the file changed since."""
+        checkpoint = self.journal.load_checkpoint(self.id)
+        if checkpoint and checkpoint[2] != source_fingerprint(self.filepath):
+            # The saved offset and row numbers would land in the middle of other records
+            raise CheckpointMismatch(
+                f"{self.filepath} changed since its checkpoint; start it again from the first row instead of resuming"
+            )
+        return checkpoint
+
+    def open_source(self, resume=False):
+        source = self.contact_source()
+        checkpoint = self.load_checkpoint() if resume else None
+        if checkpoint:
+            # Rows up to the checkpoint are never re-read; later rows that already
+            # finished out of order are skipped using the rebuilt status table
+            row_id, offset, _ = checkpoint
+            self.load()
+            # Numbers sent before the interruption still count as seen for deduplication
+            for _, phone_number, _, status in self.journal.outcomes(self.id):
+                # Rejected rows are journaled with the raw value, which never went out
+                if status not in (INVALID, DUPLICATE):
+                    self.phones.add_seen(phone_number)
+            self.log(f"Resuming after row {row_id} ({self.recipients.sent} sent, {self.recipients.failed} failed so far).")
+            source.start_row, source.start_offset = row_id + 1, offset
+            return source
+
+        if resume:
+            self.log("No checkpoint for this file; starting from the first row.")
+        self.journal.clear(self.id)
+        self.recipients = RecipientStatus()
+        return source
+
+    def validate(self, scan_rows=False, limit=20, resume=False):
+        """Check the template, phone numbers and attachments before any browser work.
+
+        Placeholders or columns missing from the header always raise
+        TemplateError, as does a first row the template cannot render (e.g. a
+        date format on a cell that is not a date); with resume, a checkpoint
+        taken on an earlier version of the file raises CheckpointMismatch.
+        With scan_rows, every row is also rendered and checked for placeholders
+        that would render empty, numbers the pre-flight check would drop and
+        attachment files that do not exist; returns the number of rows with
+        empty fields or render errors, logging the first few of each.
+
+        The contact file stays open for run() unless the check fails.
+        """
+        try:
+            source = self.contact_source()
+            header = source.read_header()
+            phone_index = self.column_index(header, self.phone_column, "Phone") or 0
+            attachment_index = self.column_index(header, self.attachment_column, "Attachment")
+            self.build_prepare(header)
+            render = self.template.compile(header) if self.template else None
+            if render and not scan_rows:
+                first = source.first_row()
+                if first:
+                    self.render_row(render, *first)
+            if resume:
+                self.load_checkpoint()
+        except Exception:
+            self.close_source()
+            raise
+        if not scan_rows:
+            return 0
+
+        blank_rows = 0
+        broken_rows = 0
+        phones = PhoneFilter(self.country_code)
+        missing = set()
+        for row_id, values in ContactSource(self.filepath):
+            if attachment_index is not None and attachment_index < len(values):
+                for path in self.attachment_paths(values[attachment_index]) or []:
+                    if path not in missing and not os.path.exists(path):
+                        missing.add(path)
+                        if len(missing) <= limit:
+                            self.log(f"Row {row_id}: attachment not found: {path}")
+            blank = self.template.blank_fields(header, values) if self.template else []
+            if blank:
+                blank_rows += 1
+                if blank_rows <= limit:
+                    self.log(f"Row {row_id}: empty {', '.join(blank)}")
+            elif render:
+                try:
+                    self.render_row(render, row_id, values)
+                except TemplateError as e:
+                    broken_rows += 1
+                    if broken_rows <= limit:
+                        self.log(str(e))
+            phone_number = values[phone_index] if phone_index < len(values) else None
+            _, reason = phones.check(phone_number)
+            if reason and phones.removed <= limit:
+                self.log(f"Row {row_id}: {reason.lower()} {phone_number}")
+        if blank_rows:
+            self.log(f"{blank_rows} row(s) have empty template fields.")
+        if broken_rows:
+            self.log(f"{broken_rows} row(s) cannot be rendered with the template.")
+        if missing:
+            self.log(f"{len(missing)} attachment file(s) not found; those rows will not be sent.")
+        self.log(phones.describe())
+        if blank_rows or broken_rows:
+            self.close_source()
+        return blank_rows + broken_rows
+
+    @staticmethod
+    def render_row(render, row_id, values):
+        try:
+            return render(values)
+        except TemplateError as e:
+            raise TemplateError(f"Row {row_id}: {str(e)}") from e
+
+    def column_index(self, header, column, label):
+        if not column:
+            return None
+        columns = [str(value) for value in header]
+        if column not in columns:
+            raise TemplateError(f"{label} column '{column}' not found in the contact file")
+        return columns.index(column)
+
+    def attachment_paths(self, value):
+        """Split a cell into attachment paths; relative paths are relative to the contact file."""
+        if value in (None, ""):
+            return None
+        base = os.path.dirname(os.path.abspath(self.filepath))
+        return [os.path.join(base, part.strip()) for part in ATTACHMENT_SEPARATORS.split(str(value)) if part.strip()]
+
+    def build_prepare(self, header):
+        """Return a function mapping row values to (phone_number, message[, attachments]).
+
+        The phone number is normalized to E.164 digits; rows with a malformed or
+        repeated number raise RejectedNumber so the pool never sends to them.
+        With an attachment column, the third item is that row's list of files.
+        """
+        phone_index = self.column_index(header, self.phone_column, "Phone") or 0
+        attachment_index = self.column_index(header, self.attachment_column, "Attachment")
+        if self.template:
+            render = self.template.compile(header)
+        else:
+            message_index = 1 if phone_index == 0 else 0
+            render = lambda values: values[message_index]
+        check = self.phones.check
+
+        def prepare(values):
+            phone_number = values[phone_index] if phone_index < len(values) else None
+            normalized, reason = check(phone_number)
+            if reason:
+                raise RejectedNumber(reason, phone_number)
+            if attachment_index is None:
+                return normalized, render(values)
+            attachments = values[attachment_index] if attachment_index < len(values) else None
+            return normalized, render(values), self.attachment_paths(attachments)
+
+        return prepare
+
+    def run(self, pool, settings, resume=False, pipelined=False, pacing=None, on_outcome=None):
+        """Send to every pending contact; blocks until the pool finishes or is stopped.
+
+        settings are WhatsAppSender keyword arguments, pacing make_pacer ones.
+        """
+        self.phones = PhoneFilter(self.country_code)
+        try:
+            # Header, size estimate and rows all come from a single open of the file
+            prepare = self.build_prepare(self.contact_source().read_header())
+            source = self.open_source(resume)
+            self.total_rows = source.estimate_total()
+            self.start_time = datetime.now()
+            self.metrics = pool.metrics
+            pool.run(source, self.id, self.recipients, settings, on_outcome=on_outcome,
+                     pipelined=pipelined, pacing=pacing, prepare=prepare)
+        finally:
+            self.close_source()
+        self.log(self.phones.describe())
+
+    @property
+    def done(self):
+        return self.recipients.sent + self.recipients.failed + self.recipients.skipped
+
+    def progress(self):
+        """Return (percent complete, estimated time remaining), or (None, None) if the size is unknown.
+
+        The estimate follows the moving-average speed from the pool's metrics, so
+        it reacts to pacing changes and ignores rows finished before a resume.
+        """
+        if not self.total_rows or not self.done:
+            return None, None
+        # The total is only an estimate, so never let progress run past 100%
+        total_rows = max(self.total_rows, self.done)
+        eta = self.metrics.eta(total_rows - self.done) if self.metrics else None
+        if eta is None:
+            elapsed_time = datetime.now() - self.start_time
+            remaining_time = (elapsed_time / self.done) * (total_rows - self.done)
+        else:
+            remaining_time = timedelta(seconds=eta)
+        return (self.done / total_rows) * 100, remaining_time
+
+    def export_reports(self, sent_path="sent_messages.xlsx", unsent_path="unsent_messages.xlsx",
+                       unconfirmed_path="unconfirmed_messages.xlsx"):
+        """Build the reports from the journal; returns (sent count, unsent count, unconfirmed count).
+
+        Rows journaled as Submitted were handed to WhatsApp but never verified, so they go to a separate
+        unconfirmed report instead of the unsent one: re-sending them could deliver a message twice.
+        """
+        sent_count = self.journal.export_sent(self.id, sent_path)
+        unsent_count = self.journal.export_unsent(ContactSource(self.filepath), self.recipients, unsent_path)
+        unconfirmed_count = self.journal.export_unconfirmed(ContactSource(self.filepath), self.recipients,
+                                                            unconfirmed_path)
+        return sent_count, unsent_count, unconfirmed_count
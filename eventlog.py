@@ -0,0 +1,84 @@
+import os
+import queue
+import threading
+import time
+
+
+# Default size at which log.txt is rotated, and how many old files are kept
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+
+
+class EventLog:
+    """Queue-based log pipeline that never blocks the thread emitting an event.
+
+    Events are (kind, message) pairs. "log" events are batched to a rotating
+    log file by a background writer thread; every event is also queued for the
+    GUI, which drains them on its own timer with drain(). Headless entry points
+    pass gui=False, since nothing would ever drain that queue.
+    """
+
+    def __init__(self, path="log.txt", max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT, flush_interval=0.5, gui=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self._file_queue = queue.SimpleQueue()
+        self._gui_queue = queue.SimpleQueue() if gui else None
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def emit(self, message, kind="log"):
+        if kind == "log":
+            self._file_queue.put(f"{time.ctime()}: {message}\n")
+        if self._gui_queue is not None:
+            self._gui_queue.put((kind, message))
+
+    def drain(self, limit=500):
+        """Return up to limit pending (kind, message) events for the GUI thread."""
+        events = []
+        while self._gui_queue is not None and len(events) < limit:
+            try:
+                events.append(self._gui_queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def close(self):
+        self._file_queue.put(None)
+        self._writer.join()
+
+    def _write_loop(self):
+        while True:
+            line = self._file_queue.get()
+            batch = [line]
+            # Collect whatever else arrived within the flush interval into one write
+            deadline = time.monotonic() + self.flush_interval
+            while line is not None and time.monotonic() < deadline:
+                try:
+                    line = self._file_queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(line)
+            closing = batch[-1] is None
+            self._write([line for line in batch if line is not None])
+            if closing:
+                return
+
+    def _write(self, lines):
+        if not lines:
+            return
+        if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        with open(self.path, "a", encoding="utf-8") as log_file:
+            log_file.writelines(lines)
+
+    def _rotate(self):
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
@@ -0,0 +1,240 @@
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+import openpyxl
+
+from phones import DUPLICATE
+
+
+SENT_STATES = ("Sent", "Delivered", "Read")
+
+# Pipelined sends are journaled as submitted until the verifier confirms them
+SUBMITTED = "Submitted"
+
+PENDING, SENT, FAILED, SUBMITTED_STATE, SKIPPED = 0, 1, 2, 3, 4
+
+
+class CheckpointMismatch(ValueError):
+    """Raised when resuming from a checkpoint taken on a different version of the contact file."""
+
+
+class RecipientStatus:
+    """Per-recipient status table: one byte per row, indexed by row id.
+
+    Marking and looking up a row are O(1), and the table is the only per-row
+    state kept in memory while a campaign runs.
+    """
+
+    def __init__(self):
+        self._states = bytearray()
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.submitted = 0
+
+    def mark(self, row_id, state):
+        if row_id >= len(self._states):
+            self._states.extend(bytes(row_id + 1 - len(self._states)))
+        previous = self._states[row_id]
+        if previous == SENT:
+            self.sent -= 1
+        elif previous == FAILED:
+            self.failed -= 1
+        elif previous == SKIPPED:
+            self.skipped -= 1
+        elif previous == SUBMITTED_STATE:
+            self.submitted -= 1
+        if state == SENT:
+            self.sent += 1
+        elif state == FAILED:
+            self.failed += 1
+        elif state == SKIPPED:
+            self.skipped += 1
+        elif state == SUBMITTED_STATE:
+            self.submitted += 1
+        self._states[row_id] = state
+
+    def get(self, row_id):
+        if row_id < len(self._states):
+            return self._states[row_id]
+        return PENDING
+
+    def is_sent(self, row_id):
+        return self.get(row_id) == SENT
+
+    def is_pending(self, row_id):
+        return self.get(row_id) == PENDING
+
+    def is_unconfirmed(self, row_id):
+        return self.get(row_id) == SUBMITTED_STATE
+
+    def needs_sending(self, row_id):
+        """True for rows the unsent report should list: not sent, not a duplicate and not awaiting confirmation."""
+        return self.get(row_id) not in (SENT, SKIPPED, SUBMITTED_STATE)
+
+
+def state_for(status):
+    """Map a status label from check_message_status onto a RecipientStatus state."""
+    if status == SUBMITTED:
+        return SUBMITTED_STATE
+    if status == DUPLICATE:
+        return SKIPPED
+    return SENT if status in SENT_STATES else FAILED
+
+
+class ResultJournal:
+    """Append-only record of per-recipient outcomes backed by SQLite in WAL mode.
+
+    Every outcome is a single small insert, so recording cost does not grow with
+    the size of the campaign. The sent/unsent Excel reports are built from the
+    journal once, at the end of a run or whenever export_reports is called.
+    """
+
+    def __init__(self, path="results_journal.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable across an application crash in WAL mode; only an OS
+        # crash or power loss can drop the last few commits.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outcomes ("
+            " campaign TEXT NOT NULL,"
+            " row_id INTEGER NOT NULL,"
+            " phone TEXT,"
+            " message TEXT,"
+            " status TEXT NOT NULL,"
+            " recorded_at REAL NOT NULL,"
+            " PRIMARY KEY (campaign, row_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " campaign TEXT PRIMARY KEY,"
+            " row_id INTEGER NOT NULL,"
+            " source_offset INTEGER,"
+            " updated_at REAL NOT NULL,"
+            " source_size INTEGER,"
+            " source_mtime_ns INTEGER)"
+        )
+
+    def record(self, campaign, row_id, phone, message, status):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?, ?, ?, ?)",
+                (campaign, row_id, phone, message, status, time.time()),
+            )
+
+    def clear(self, campaign):
+        with self._lock:
+            self._conn.execute("DELETE FROM outcomes WHERE campaign = ?", (campaign,))
+            self._conn.execute("DELETE FROM checkpoints WHERE campaign = ?", (campaign,))
+
+    def checkpoint(self, campaign, row_id, offset=None, fingerprint=None):
+        """Record that every row up to row_id has an outcome; offset is the source position after it.
+
+        fingerprint is the contact file's (size, mtime_ns) when the run started,
+        so a resume can tell the offset no longer points at a row boundary.
+        """
+        size, mtime_ns = fingerprint or (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?)",
+                (campaign, row_id, offset, time.time(), size, mtime_ns),
+            )
+
+    def load_checkpoint(self, campaign):
+        """Return (row_id, offset, fingerprint) of the last checkpoint, or None for a fresh campaign."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT row_id, source_offset, source_size, source_mtime_ns FROM checkpoints WHERE campaign = ?",
+                (campaign,),
+            ).fetchone()
+        if row is None:
+            return None
+        row_id, offset, size, mtime_ns = row
+        return row_id, offset, (size, mtime_ns)
+
+    def load_status(self, campaign):
+        """Rebuild the RecipientStatus table of an interrupted campaign from its outcomes."""
+        recipients = RecipientStatus()
+        for row_id, _, _, status in self.outcomes(campaign):
+            recipients.mark(row_id, state_for(status))
+        return recipients
+
+    def outcomes(self, campaign):
+        """Yield (row_id, phone, message, status) in row order."""
+        # A separate read connection streams rows without holding the writer lock;
+        # WAL lets it run alongside ongoing inserts.
+        reader = sqlite3.connect(self.path)
+        try:
+            yield from reader.execute(
+                "SELECT row_id, phone, message, status FROM outcomes"
+                " WHERE campaign = ? ORDER BY row_id",
+                (campaign,),
+            )
+        finally:
+            reader.close()
+
+    def export_sent(self, campaign, sent_path="sent_messages.xlsx"):
+        wb_sent = openpyxl.Workbook(write_only=True)
+        sheet_sent = wb_sent.create_sheet()
+        sheet_sent.append(["Phone Number", "Message", "Status"])
+        count = 0
+        for _, phone, message, status in self.outcomes(campaign):
+            if status in SENT_STATES:
+                sheet_sent.append([phone, message, status])
+                count += 1
+        wb_sent.save(sent_path)
+        return count
+
+    def export_unsent(self, source, recipients, unsent_path="unsent_messages.xlsx"):
+        """Write every row not sent or skipped as a duplicate, re-streaming (row_id, values) from the source."""
+        wb_unsent, count = self._export_rows(source, recipients.needs_sending)
+        wb_unsent.save(unsent_path)
+        return count
+
+    def export_unconfirmed(self, source, recipients, unconfirmed_path="unconfirmed_messages.xlsx"):
+        """Write rows submitted but never verified; they may have been delivered, so they are not unsent.
+
+        Nothing is written when there are no such rows, and a stale report from an earlier export is removed.
+        """
+        if not recipients.submitted:
+            if os.path.exists(unconfirmed_path):
+                os.remove(unconfirmed_path)
+            return 0
+        wb_unconfirmed, count = self._export_rows(source, recipients.is_unconfirmed)
+        wb_unconfirmed.save(unconfirmed_path)
+        return count
+
+    @staticmethod
+    def _export_rows(source, keep):
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        rows = iter(source)
+        # The source only knows its header once the first row has been read
+        first = next(rows, None)
+        sheet.append(list(source.header))
+        count = 0
+        for row_id, values in itertools.chain([first] if first else [], rows):
+            if keep(row_id):
+                sheet.append(list(values))
+                count += 1
+        return workbook, count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def campaign_id(filepath):
+    return os.path.abspath(filepath)
+
+
+def source_fingerprint(filepath):
+    """(size, mtime_ns) identifying one version of a contact file."""
+    stat = os.stat(filepath)
+    return stat.st_size, stat.st_mtime_ns
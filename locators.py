@@ -0,0 +1,79 @@
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+
+# Structural locators that work whatever language the WhatsApp Web UI is in
+LOCALE_INDEPENDENT_XPATHS = {
+    "message_box": ["//footer//div[@contenteditable='true']"],
+    "caption": ["//div[@contenteditable='true'][not(ancestor::footer)][not(ancestor::*[@id='side'])]"],
+}
+
+# aria-placeholder texts per UI language, tried after the structural locators
+PLACEHOLDERS = {
+    "message_box": {
+        "en": "Type a message",
+        "ar": "اكتب رسالة",
+    },
+    "caption": {
+        "en": "add caption",
+        "ar": "إضافة شرح",
+    },
+}
+
+LANGUAGES = ["auto", *sorted(PLACEHOLDERS["message_box"])]
+
+
+class LocatorRegistry:
+    """Resolves the XPaths for one browser session's WhatsApp Web UI and caches them.
+
+    The UI language is read from the page once, the first time a locator is
+    needed, unless it was given explicitly. Until a role is resolved, lookups
+    use the union of all its candidates, so a wrong language costs no extra
+    timeouts; the candidate that actually matched is then used for the rest of
+    the session.
+    """
+
+    def __init__(self, driver, language="auto", log=None):
+        self.driver = driver
+        self.language = language
+        self.log = log or (lambda message: None)
+        self.locale = None if language == "auto" else language
+        self.resolved = {}
+
+    def detect_locale(self):
+        if self.locale is None:
+            try:
+                lang = self.driver.execute_script("return document.documentElement.lang || navigator.language")
+            except WebDriverException:
+                lang = None
+            self.locale = (lang or "").split("-")[0].lower()
+            self.log(f"WhatsApp Web UI language: {self.locale or 'unknown'}.")
+        return self.locale
+
+    def candidates(self, role):
+        placeholders = PLACEHOLDERS[role]
+        locale = self.detect_locale()
+        languages = [locale] if locale in placeholders else []
+        languages += [language for language in placeholders if language != locale]
+        return LOCALE_INDEPENDENT_XPATHS[role] + [
+            f"//div[@aria-placeholder='{placeholders[language]}']" for language in languages
+        ]
+
+    def locator(self, role):
+        if role in self.resolved:
+            return By.XPATH, self.resolved[role]
+        return By.XPATH, " | ".join(self.candidates(role))
+
+    def found(self, role, element):
+        """Remember which candidate located element, so later lookups skip the others."""
+        if role in self.resolved:
+            return
+        for xpath in self.candidates(role):
+            if element in self.driver.find_elements(By.XPATH, xpath):
+                self.resolved[role] = xpath
+                self.log(f"Using {xpath} for the {role.replace('_', ' ')}.")
+                return
+
+    def forget(self, role):
+        """Drop a cached locator that stopped matching, e.g. after a WhatsApp Web update."""
+        self.resolved.pop(role, None)
@@ -1,27 +1,23 @@
-import platform
-import subprocess
-from PIL import Image
-from io import BytesIO
-import win32clipboard
-import openpyxl
-import re
-import pyperclip
 import tkinter as tk
 from tkinter import filedialog, ttk
 import threading
-from tkinter import messagebox
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
-from selenium.webdriver.common.keys import Keys
-import time
-from selenium.webdriver.chrome.options import Options
 import os
 import shutil
-from PIL import ImageGrab, Image
-from datetime import datetime
+from eventlog import EventLog
+from engine import Campaign
+from journal import ResultJournal
+from metrics import MetricsExporter
+from templates import TemplateError, load_template
+from pool import WorkerPool
+from scheduler import CampaignQueue, Scheduler
+from pacing import DEFAULT_RATE, FIXED_DELAY
+from sender import STATUS_TIMEOUT
+
+# Log lines kept in the on-screen log; log.txt keeps everything
+MAX_LOG_LINES = 1000
+
+# How often the GUI applies queued log and status events
+EVENT_POLL_MS = 100
 
 
 class WhatsAppAutomation:
@@ -33,15 +29,21 @@ class WhatsAppAutomation:
         self.root.resizable(True, True)
 
         self.init_gui()
+        self.events = EventLog()
+        self.root.after(EVENT_POLL_MS, self.drain_events)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
-        self.driver = None
-        self.wait = None
+        self.pool = None
         self.filepath = ''
         self.webdriver_path = ''
         self.photo_path = ''
+        self.template = None
         self.stop_thread = False
         self.pause_thread = False
         self.process_thread = None  # For concurrency management
+        self.journal = ResultJournal()
+        self.campaign = None
+        self.scheduler = None
 
     def init_gui(self):
         main_frame = tk.Frame(self.root, padx=10, pady=10)
@@ -53,19 +55,42 @@ class WhatsAppAutomation:
         btn_webdriver = tk.Button(main_frame, text="Set WebDriver Path", command=self.set_webdriver_path, padx=10, pady=5)
         btn_webdriver.pack(pady=5)
 
+        sessions_frame = tk.Frame(main_frame)
+        sessions_frame.pack(pady=5)
+        self.session_count = tk.IntVar(value=1)
+        tk.Label(sessions_frame, text="Sessions:").pack(side="left", padx=5)
+        tk.Spinbox(sessions_frame, from_=1, to=8, width=4, textvariable=self.session_count).pack(side="left", padx=5)
+
         btn_login = tk.Button(main_frame, text="Login", command=self.login, padx=10, pady=5)
         btn_login.pack(pady=5)
 
-        btn_choose_file = tk.Button(main_frame, text="Choose Excel File", command=self.choose_file, padx=10, pady=5)
+        btn_choose_file = tk.Button(main_frame, text="Choose Contact File", command=self.choose_file, padx=10, pady=5)
         btn_choose_file.pack(pady=5)
 
-        self.chosen_language = tk.StringVar(value="en")
+        template_frame = tk.Frame(main_frame)
+        template_frame.pack(pady=5)
+        tk.Button(template_frame, text="Choose Template", command=self.choose_template, padx=10, pady=5).pack(side="left", padx=5)
+        tk.Label(template_frame, text="Phone column:").pack(side="left", padx=5)
+        self.phone_column = tk.StringVar(value="")
+        tk.Entry(template_frame, textvariable=self.phone_column, width=12).pack(side="left", padx=5)
+        tk.Label(template_frame, text="Country code:").pack(side="left", padx=5)
+        self.country_code = tk.StringVar(value="")
+        tk.Entry(template_frame, textvariable=self.country_code, width=5).pack(side="left", padx=5)
+        tk.Label(template_frame, text="Attachment column:").pack(side="left", padx=5)
+        self.attachment_column = tk.StringVar(value="")
+        tk.Entry(template_frame, textvariable=self.attachment_column, width=12).pack(side="left", padx=5)
+        self.validate_rows = tk.BooleanVar(value=False)
+        tk.Checkbutton(template_frame, text="Check every row first", variable=self.validate_rows).pack(side="left", padx=5)
+
+        self.chosen_language = tk.StringVar(value="auto")
         self.send_mode = tk.StringVar(value="message")
 
         lang_frame = tk.Frame(main_frame)
         lang_frame.pack(pady=5)
+        lang_auto = tk.Radiobutton(lang_frame, text="Auto-detect", variable=self.chosen_language, value="auto")
         lang_en = tk.Radiobutton(lang_frame, text="English", variable=self.chosen_language, value="en")
         lang_ar = tk.Radiobutton(lang_frame, text="Arabic", variable=self.chosen_language, value="ar")
+        lang_auto.pack(side="left", padx=5)
         lang_en.pack(side="left", padx=5)
         lang_ar.pack(side="right", padx=5)
 
@@ -76,19 +101,75 @@ class WhatsAppAutomation:
         mode_message.pack(side="left", padx=5)
         mode_photo.pack(side="right", padx=5)
 
-        self.btn_choose_photo = tk.Button(main_frame, text="Choose Photo", command=self.choose_photo, padx=10, pady=5)
-        self.btn_choose_photo.pack(pady=5)
-        self.btn_choose_photo.pack_forget()
+        self.fast_navigation = tk.BooleanVar(value=True)
+        chk_fast = tk.Checkbutton(main_frame, text="Fast chat navigation (no page reload)", variable=self.fast_navigation)
+        chk_fast.pack(pady=5)
+
+        self.pipelined = tk.BooleanVar(value=False)
+        chk_pipelined = tk.Checkbutton(main_frame, text="Pipelined sending (verify delivery in batches)", variable=self.pipelined)
+        chk_pipelined.pack(pady=5)
+
+        timeout_frame = tk.Frame(main_frame)
+        timeout_frame.pack(pady=5)
+        self.status_timeout = tk.IntVar(value=STATUS_TIMEOUT)
+        tk.Label(timeout_frame, text="Status timeout (s):").pack(side="left", padx=5)
+        tk.Spinbox(timeout_frame, from_=1, to=300, width=5, textvariable=self.status_timeout).pack(side="left", padx=5)
+
+        pacing_frame = tk.Frame(main_frame)
+        pacing_frame.pack(pady=5)
+        self.pacing_mode = tk.StringVar(value="adaptive")
+        self.rate = tk.IntVar(value=DEFAULT_RATE)
+        tk.Label(pacing_frame, text="Pacing:").pack(side="left", padx=5)
+        tk.OptionMenu(pacing_frame, self.pacing_mode, "adaptive", "bucket", "fixed").pack(side="left", padx=5)
+        tk.Label(pacing_frame, text="Max msg/min per session:").pack(side="left", padx=5)
+        tk.Spinbox(pacing_frame, from_=1, to=120, width=5, textvariable=self.rate).pack(side="left", padx=5)
+        self.fixed_delay = tk.DoubleVar(value=FIXED_DELAY)
+        tk.Label(pacing_frame, text="Fixed delay (s):").pack(side="left", padx=5)
+        tk.Spinbox(pacing_frame, from_=0, to=60, increment=0.5, width=5, textvariable=self.fixed_delay).pack(side="left", padx=5)
+
+        self.photo_frame = tk.Frame(main_frame)
+        self.btn_choose_photo = tk.Button(self.photo_frame, text="Choose Photo", command=self.choose_photo, padx=10, pady=5)
+        self.btn_choose_photo.pack(side="left", padx=5)
+        self.photo_max_dimension = tk.IntVar(value=0)
+        tk.Label(self.photo_frame, text="Max side (px, 0 = original):").pack(side="left", padx=5)
+        tk.Spinbox(self.photo_frame, from_=0, to=4096, increment=256, width=6, textvariable=self.photo_max_dimension).pack(side="left", padx=5)
 
         btn_send = tk.Button(main_frame, text="Send", command=self.start_process, padx=10, pady=5, bg="green", fg="white")
         btn_send.pack(pady=5)
 
+        btn_resume = tk.Button(main_frame, text="Resume Campaign", command=lambda: self.start_process(resume=True), padx=10, pady=5)
+        btn_resume.pack(pady=5)
+
         self.btn_pause = tk.Button(main_frame, text="Pause", command=self.pause_messages, padx=10, pady=5, bg="orange", fg="white")
         self.btn_pause.pack(pady=5)
 
         btn_stop = tk.Button(main_frame, text="Stop", command=self.stop_messages, padx=10, pady=5, bg="red", fg="white")
         btn_stop.pack(pady=5)
 
+        schedule_frame = tk.Frame(main_frame)
+        schedule_frame.pack(pady=5)
+        self.priority = tk.IntVar(value=0)
+        self.send_window = tk.StringVar(value="")
+        tk.Label(schedule_frame, text="Priority:").pack(side="left", padx=5)
+        tk.Spinbox(schedule_frame, from_=0, to=100, width=4, textvariable=self.priority).pack(side="left", padx=5)
+        tk.Label(schedule_frame, text="Window (HH:MM-HH:MM):").pack(side="left", padx=5)
+        tk.Entry(schedule_frame, textvariable=self.send_window, width=12).pack(side="left", padx=5)
+        tk.Button(schedule_frame, text="Add to Queue", command=self.add_to_queue).pack(side="left", padx=2)
+        tk.Button(schedule_frame, text="Run Queue", command=self.start_queue).pack(side="left", padx=2)
+
+        session_frame = tk.Frame(main_frame)
+        session_frame.pack(pady=5)
+        self.session_index = tk.IntVar(value=1)
+        tk.Label(session_frame, text="Session:").pack(side="left", padx=5)
+        tk.Spinbox(session_frame, from_=1, to=8, width=4, textvariable=self.session_index).pack(side="left", padx=5)
+        tk.Button(session_frame, text="Pause/Resume", command=self.pause_session).pack(side="left", padx=2)
+        tk.Button(session_frame, text="Stop", command=self.stop_session).pack(side="left", padx=2)
+        tk.Button(session_frame, text="Restart", command=self.restart_session).pack(side="left", padx=2)
+        tk.Button(session_frame, text="Health", command=self.show_health).pack(side="left", padx=2)
+
+        btn_export = tk.Button(main_frame, text="Export Reports", command=self.export_reports, padx=10, pady=5)
+        btn_export.pack(pady=5)
+
         self.info_var = tk.StringVar()
         self.info_var.set("Status: Waiting...")
         lbl_info = tk.Label(main_frame, textvariable=self.info_var, pady=10, font=("Arial", 12))
@@ -111,11 +192,16 @@ class WhatsAppAutomation:
         lbl_time = tk.Label(main_frame, textvariable=self.time_var, pady=10, font=("Arial", 12))
         lbl_time.pack()
 
+        self.pacing_var = tk.StringVar()
+        self.pacing_var.set("Pacing: --")
+        lbl_pacing = tk.Label(main_frame, textvariable=self.pacing_var, font=("Arial", 10))
+        lbl_pacing.pack()
+
     def toggle_photo_options(self):
         if self.send_mode.get() == "photo":
-            self.btn_choose_photo.pack(pady=5)
+            self.photo_frame.pack(pady=5)
         else:
-            self.btn_choose_photo.pack_forget()
+            self.photo_frame.pack_forget()
 
     def choose_photo(self):
         self.photo_path = filedialog.askopenfilename(title="Select Photo", filetypes=[("Image files", "*.jpg;*.jpeg;*.png"), ("All files", "*.*")])
@@ -128,51 +214,91 @@ class WhatsAppAutomation:
             self.update_info_var("No photo chosen.")
             self.update_text_area("No photo chosen.")
 
-    def copy_image_to_clipboard(self, image_path):
-        system_platform = platform.system()
-
-        if system_platform == "Windows":
-            image = Image.open(image_path)
-            output = BytesIO()
-            image.convert("RGB").save(output, "BMP")
-            data = output.getvalue()[14:]
-            output.close()
-
-            win32clipboard.OpenClipboard()
-            win32clipboard.EmptyClipboard()
-            win32clipboard.SetClipboardData(win32clipboard.CF_DIB, data)
-            win32clipboard.CloseClipboard()
-
-        elif system_platform == "Linux":
-            image = Image.open(image_path)
-            output = BytesIO()
-            image.save(output, "PNG")
-            output.seek(0)
-
-            process = subprocess.Popen(['xclip', '-selection', 'clipboard', '-t', 'image/png'], stdin=subprocess.PIPE)
-            process.communicate(input=output.read())
-
-        elif system_platform == "Darwin":
-            image = Image.open(image_path)
-            output = BytesIO()
-            image.save(output, "PNG")
-            output.seek(0)
-
-            process = subprocess.Popen(['osascript', '-e', 'set the clipboard to (read (POSIX file "{}") as JPEG picture)'.format(image_path)],
-                                    stdin=subprocess.PIPE)
-            process.communicate(input=output.read())
-
-        else:
-            raise NotImplementedError(f"Clipboard copy is not implemented for {system_platform}.")
-
-    def start_process(self):
+    def snapshot_settings(self):
+        """Read the Tk variables on the GUI thread; workers only ever see this snapshot."""
+        return {
+            "language": self.chosen_language.get(),
+            "send_mode": self.send_mode.get(),
+            "photo_path": self.photo_path,
+            "photo_max_dimension": self.photo_max_dimension.get() or None,
+            "navigation": "fast" if self.fast_navigation.get() else "reload",
+            "status_timeout": self.status_timeout.get(),
+            "pipelined": self.pipelined.get(),
+            "pacing": {"mode": self.pacing_mode.get(), "rate": self.rate.get(), "delay": self.fixed_delay.get()},
+            "phone_column": self.phone_column.get().strip() or None,
+            "country_code": self.country_code.get().strip().lstrip("+") or None,
+            "attachment_column": self.attachment_column.get().strip() or None,
+            "validate_rows": self.validate_rows.get(),
+        }
+
+    def start_process(self, resume=False):
         """Start the message sending process in a separate thread for concurrency management."""
         if not self.process_thread or not self.process_thread.is_alive():
-            self.process_thread = threading.Thread(target=self.send_messages)
+            settings = self.snapshot_settings()
+            if settings["pacing"]["mode"] != "fixed" and settings["pacing"]["rate"] <= 0:
+                self.update_info_var("Rate must be above 0 messages per minute!")
+                return
+            if settings["pacing"]["delay"] < 0:
+                self.update_info_var("Delay must not be negative!")
+                return
+            self.process_thread = threading.Thread(target=self.send_messages, args=(settings, resume))
             self.process_thread.start()
 
+    def add_to_queue(self):
+        """Queue the chosen contact file with the current settings; a running queue picks it up."""
+        if not self.filepath:
+            self.update_info_var("Please choose a contact file first!")
+            return
+        settings = self.snapshot_settings()
+        settings.pop("validate_rows")
+        pacing = settings.pop("pacing")
+        settings["pacing"] = pacing["mode"]
+        settings["delay"] = pacing["delay"]
+        if self.template:
+            settings["template"] = self.template.text
+        queue = CampaignQueue(self.journal.path)
+        try:
+            # The per-session rate applies to every session, so the campaign gets their sum
+            job_id = queue.add(self.filepath, self.priority.get(), self.send_window.get().strip() or None,
+                               pacing["rate"] * self.session_count.get(), settings)
+            self.update_text_area(f"Queued campaign #{job_id}: {self.filepath}")
+        except ValueError as e:
+            self.update_info_var(str(e))
+        finally:
+            queue.close()
+
+    def start_queue(self):
+        if self.process_thread and self.process_thread.is_alive():
+            self.update_info_var("A campaign is already running.")
+            return
+        if not self.pool:
+            self.update_info_var("Please login first!")
+            return
+        self.process_thread = threading.Thread(target=self.run_queue)
+        self.process_thread.start()
+
+    def run_queue(self):
+        self.stop_thread = False
+        queue = CampaignQueue(self.journal.path)
+        self.scheduler = Scheduler(self.pool, self.journal, queue, log=self.update_text_area, info=self.update_info_var,
+                                   on_outcome=lambda row_id, status: self.report_progress(self.scheduler.campaign))
+        self.pool.pause(paused=self.pause_thread)
+        exporter = MetricsExporter(self.pool.metrics, path="metrics.prom").start()
+        self.update_info_var("Status: Running the campaign queue...")
+        try:
+            self.scheduler.run()
+        except Exception as e:
+            self.update_text_area(f"Error while running the queue: {str(e)}")
+        finally:
+            exporter.stop()
+            queue.close()
+            self.scheduler = None
+            self.update_info_var("Status: Campaign queue finished.")
+
     def pause_messages(self):
         self.pause_thread = not self.pause_thread
+        if self.pool:
+            self.pool.pause(paused=self.pause_thread)
         if self.pause_thread:
             self.update_info_var("Paused...")
             self.btn_pause.config(text="Resume", bg="blue")  # Update button to "Resume"
@@ -183,11 +309,50 @@ class WhatsAppAutomation:
     def stop_messages(self):
         """Stop the message sending process."""
         self.stop_thread = True
+        if self.scheduler:
+            self.scheduler.stop()
+        elif self.pool:
+            self.pool.stop()
         self.update_info_var("Stopping...")
         self.update_text_area("Attempting to stop the message sending process...")
-        if self.process_thread and self.process_thread.is_alive():
-            self.process_thread.join()  # Ensure the thread is terminated correctly
-        self.update_info_var("Process Stopped.")
+
+    def selected_worker(self):
+        if not self.pool:
+            self.update_info_var("Please login first!")
+            return None
+        index = self.session_index.get() - 1
+        if not 0 <= index < len(self.pool.workers):
+            self.update_info_var(f"No session {index + 1}; {len(self.pool.workers)} session(s) open.")
+            return None
+        return self.pool.workers[index]
+
+    def pause_session(self):
+        worker = self.selected_worker()
+        if worker:
+            self.pool.pause(worker.index, paused=not worker.paused)
+            self.update_text_area(f"{worker.name} {'paused' if worker.paused else 'resumed'}.")
+
+    def stop_session(self):
+        worker = self.selected_worker()
+        if worker:
+            self.pool.stop(worker.index)
+            self.update_text_area(f"{worker.name} will stop after its current recipient.")
+
+    def restart_session(self):
+        worker = self.selected_worker()
+        if worker and self.pool.restart(worker.index):
+            self.update_text_area(f"{worker.name} restarted.")
+
+    def show_health(self):
+        if not self.pool:
+            self.update_info_var("Please login first!")
+            return
+        for health in self.pool.health():
+            self.update_text_area(
+                f"Session {health['session']}: {health['state']}, sent {health['sent']}, "
+                f"failed {health['failed']}, restarts {health['restarts']}, {health['pacing']}"
+                + (f", last error: {health['last_error'][:80]}" if health['last_error'] else "")
+            )
 
     def set_webdriver_path(self):
         self.webdriver_path = filedialog.askopenfilename(title="Select WebDriver", filetypes=[("Executable files", "*.exe"), ("All files", "*.*")])
@@ -204,293 +369,185 @@ class WhatsAppAutomation:
             self.update_text_area("Please select WebDriver path first!")
             return
 
-        chrome_options = Options()
-        data_dir = os.path.join(os.getcwd(), 'whatsapp_session')
-        chrome_options.add_argument(f"--user-data-dir={data_dir}")
+        if self.pool:
+            self.pool.close()
 
-        try:
-            service = webdriver.chrome.service.Service(self.webdriver_path)
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.wait = WebDriverWait(self.driver, 10)
-        except WebDriverException as e:
-            self.update_info_var(f"Failed to launch WebDriver: {str(e)}")
-            self.update_text_area(f"Error launching WebDriver: {str(e)}")
+        # Each session gets its own Chrome profile, so each window links its own account
+        self.pool = WorkerPool(self.webdriver_path, self.session_count.get(), self.journal,
+                               log=self.update_text_area, info=self.update_info_var)
+        failed = self.pool.open_sessions()
+        if len(failed) == len(self.pool.workers):
+            self.pool = None
+            self.update_info_var("Failed to launch WebDriver")
             return
 
-        try:
-            self.driver.get("https://web.whatsapp.com/")
-            self.update_info_var("Status: Please login to WhatsApp...")
-            self.update_text_area("Opened WhatsApp Web. Please login.")
-        except Exception as e:
-            self.update_info_var(f"Failed to open WhatsApp Web: {str(e)}")
-            self.update_text_area(f"Error opening WhatsApp Web: {str(e)}")
+        self.update_info_var("Status: Please login to WhatsApp...")
+        self.update_text_area(f"Opened WhatsApp Web in {len(self.pool.workers) - len(failed)} session(s). Please login in each window.")
 
     def choose_file(self):
-        self.filepath = filedialog.askopenfilename(title="Select Excel File", filetypes=[("Excel files", "*.xlsx")])
+        self.filepath = filedialog.askopenfilename(title="Select Contact File", filetypes=[("Contact files", "*.xlsx;*.csv;*.jsonl"), ("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl")])
         if self.filepath:
             self.update_info_var(f"File chosen: {self.filepath}")
-            self.update_text_area(f"Chosen Excel File: {self.filepath}")
+            self.update_text_area(f"Chosen Contact File: {self.filepath}")
         else:
             self.update_info_var("No file chosen.")
             self.update_text_area("No file chosen.")
 
-    def update_progress(self, value):
-        self.progress["value"] = value
-        self.root.update_idletasks()
-
-    def update_text_area(self, message):
-        self.text_area.insert(tk.END, message + "\n")
-        self.text_area.see(tk.END)
-        with open("log.txt", "a") as log_file:
-            log_file.write(f"{time.ctime()}: {message}\n")
-
-    def _safe_update_text_area(self, message):
-        self.root.after(0, lambda: self.update_text_area(message))
-
-    def update_info_var(self, message):
-        self.root.after(0, self._safe_update_info_var, message)
-
-    def _safe_update_info_var(self, message):
-        self.info_var.set(message)
-
-    # All send_messages and unsent_messages related code remains unchanged
-
-
-    def set_webdriver_path(self):
-        self.webdriver_path = filedialog.askopenfilename(title="Select WebDriver", filetypes=[("Executable files", "*.exe"), ("All files", "*.*")])
-        if self.webdriver_path and os.path.isfile(self.webdriver_path):
-            self.update_info_var(f"WebDriver set to: {self.webdriver_path}")
-            self.update_text_area(f"WebDriver set to: {self.webdriver_path}")
-        else:
-            self.update_info_var("Invalid WebDriver path!")
-            self.update_text_area("Invalid WebDriver path!")
-
-    def login(self):
-        if not self.webdriver_path:
-            self.update_info_var("Please select WebDriver path first!")
-            self.update_text_area("Please select WebDriver path first!")
+    def choose_template(self):
+        path = filedialog.askopenfilename(title="Select Message Template", filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        if not path:
+            self.template = None
+            self.update_text_area("No template chosen; messages are taken from the contact file.")
             return
-
-        chrome_options = Options()
-        data_dir = os.path.join(os.getcwd(), 'whatsapp_session')
-        chrome_options.add_argument(f"--user-data-dir={data_dir}")
-
         try:
-            service = webdriver.chrome.service.Service(self.webdriver_path)
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.wait = WebDriverWait(self.driver, 10)
-        except WebDriverException as e:
-            self.update_info_var(f"Failed to launch WebDriver: {str(e)}")
-            self.update_text_area(f"Error launching WebDriver: {str(e)}")
+            self.template = load_template(path)
+        except (OSError, TemplateError) as e:
+            self.template = None
+            self.update_info_var("Invalid template!")
+            self.update_text_area(f"Could not load template: {str(e)}")
             return
+        self.update_text_area(f"Template chosen: {path} (fields: {', '.join(self.template.fields) or 'none'})")
 
-        try:
-            self.driver.get("https://web.whatsapp.com/")
-            self.update_info_var("Status: Please login to WhatsApp...")
-            self.update_text_area("Opened WhatsApp Web. Please login.")
-        except Exception as e:
-            self.update_info_var(f"Failed to open WhatsApp Web: {str(e)}")
-            self.update_text_area(f"Error opening WhatsApp Web: {str(e)}")
+    def export_reports(self):
+        """Build sent_messages.xlsx, unsent_messages.xlsx and unconfirmed_messages.xlsx from the journal on demand."""
+        if not self.filepath:
+            self.update_info_var("Please choose a contact file first!")
+            return
+        campaign = self.campaign
+        if campaign is None or campaign.filepath != self.filepath:
+            campaign = Campaign(self.filepath, self.journal).load()
+        sent_count, unsent_count, unconfirmed_count = campaign.export_reports()
+        self.update_text_area(f"Exported {sent_count} sent and {unsent_count} unsent messages.")
+        if unconfirmed_count:
+            self.update_text_area(f"{unconfirmed_count} submitted messages were never confirmed; "
+                                  "see unconfirmed_messages.xlsx.")
+
+    # The update_* methods are safe to call from any thread: they only enqueue an
+    # event, and drain_events applies them to the widgets on the Tk thread.
 
-    def choose_file(self):
-        self.filepath = filedialog.askopenfilename(title="Select Excel File", filetypes=[("Excel files", "*.xlsx")])
-        if self.filepath:
-            self.update_info_var(f"File chosen: {self.filepath}")
-            self.update_text_area(f"Chosen Excel File: {self.filepath}")
-        else:
-            self.update_info_var("No file chosen.")
-            self.update_text_area("No file chosen.")
+    def update_progress(self, value):
+        self.events.emit(value, kind="progress")
 
-    def send_messages(self):
+    def update_text_area(self, message):
+        self.events.emit(message)
+
+    def update_info_var(self, message):
+        self.events.emit(message, kind="info")
+
+    def update_time_var(self, message):
+        self.events.emit(message, kind="time")
+
+    def update_pacing_var(self, message):
+        self.events.emit(message, kind="pacing")
+
+    def drain_events(self):
+        lines = []
+        latest = {}
+        for kind, message in self.events.drain():
+            if kind == "log":
+                lines.append(message)
+            else:
+                # Only the newest value of a label or the progress bar matters
+                latest[kind] = message
+
+        if lines:
+            self.text_area.insert(tk.END, "\n".join(lines) + "\n")
+            line_count = int(self.text_area.index("end-1c").split(".")[0])
+            if line_count > MAX_LOG_LINES:
+                self.text_area.delete("1.0", f"{line_count - MAX_LOG_LINES}.0")
+            self.text_area.see(tk.END)
+        if "info" in latest:
+            self.info_var.set(latest["info"])
+        if "time" in latest:
+            self.time_var.set(latest["time"])
+        if "pacing" in latest:
+            self.pacing_var.set(latest["pacing"])
+        if "progress" in latest:
+            self.progress["value"] = latest["progress"]
+
+        self.root.after(EVENT_POLL_MS, self.drain_events)
+
+    def on_close(self):
+        if self.pool:
+            self.pool.stop()
+        self.events.close()
+        self.root.destroy()
+
+    def send_messages(self, settings, resume=False):
         self.stop_thread = False
 
-        if not self.driver:
+        if not self.pool:
             self.update_info_var("Please login first!")
             self.update_text_area("Please login first!")
             return
         if not self.filepath:
-            self.update_info_var("Please choose an Excel file first!")
-            self.update_text_area("Please choose an Excel file first!")
+            self.update_info_var("Please choose a contact file first!")
+            self.update_text_area("Please choose a contact file first!")
             return
 
         self.update_info_var("Status: Sending messages...")
         self.update_text_area("Started sending messages...")
 
+        phone_column = settings.pop("phone_column")
+        country_code = settings.pop("country_code")
+        attachment_column = settings.pop("attachment_column")
+        validate_rows = settings.pop("validate_rows")
+        campaign = Campaign(self.filepath, self.journal, log=self.update_text_area, info=self.update_info_var,
+                            template=self.template, phone_column=phone_column, country_code=country_code,
+                            attachment_column=attachment_column)
+        # Template and phone number problems are reported before any browser work starts
         try:
-            wb = openpyxl.load_workbook(self.filepath)
-            sheet = wb.active
-
-            # Workbooks for sent and unsent messages
-            wb_sent = openpyxl.Workbook()
-            sheet_sent = wb_sent.active
-            sheet_sent.append(["Phone Number", "Message", "Status"])
-
-            wb_unsent = openpyxl.Workbook()
-            sheet_unsent = wb_unsent.active
-            for row in sheet.iter_rows(values_only=True):
-                sheet_unsent.append(row)
-
-            unsent_row = 2
-            total_rows = sheet.max_row - 1
-            start_time = datetime.now()
-
-            for idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=1):
-                if self.stop_thread:
-                    self.update_text_area("Stopping the message sending process...")
-                    break
-                while self.pause_thread:
-                    self.update_info_var("Status: Paused. Click Resume to continue.")
-                    time.sleep(1)
-
-                phone_number, message = row
-                phone_number = str(phone_number)
-                message = str(message)
-
-                try:
-                    self.driver.get(f"https://web.whatsapp.com/send?phone={phone_number}")
-                    self.update_text_area(f"Attempting to send to {phone_number}...")
-
-                    retries = 0
-                    message_box = None
-                    while retries < 3:
-                        try:
-                            if self.chosen_language.get() == "en":
-                                message_box = self.wait.until(EC.presence_of_element_located((By.XPATH, "//div[@aria-placeholder='Type a message']")))
-                            elif self.chosen_language.get() == "ar":
-                                message_box = self.wait.until(EC.presence_of_element_located((By.XPATH, "//div[@aria-placeholder='اكتب رسالة']")))
-                            break
-                        except TimeoutException:
-                            retries += 1
-                            self.update_info_var(f"Retry {retries} for {phone_number}")
-                            self.update_text_area(f"Retry {retries}: Failed to locate message box for {phone_number}")
-                            continue
-
-                    if not message_box:
-                        self.update_text_area(f"Failed to find message box for {phone_number} after retries.")
-                        unsent_row += 1
-                        wb_unsent.save("unsent_messages.xlsx")  # Save after each unsent message
-                        continue
-
-                    if self.send_mode.get() == "message":
-                        cleaned_message = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\xff]', '', message)
-                        pyperclip.copy(cleaned_message)
-                        message_box.send_keys(Keys.CONTROL, 'v')
-                        message_box.send_keys(Keys.ENTER)
-                    else:
-                        if self.photo_path:
-                            self.copy_image_to_clipboard(self.photo_path)
-                            message_box.send_keys(Keys.CONTROL, 'v')
-                            message_box.send_keys(Keys.ENTER)
-                            try:
-                                if self.chosen_language.get() == "en":
-                                    message_box = self.wait.until(EC.presence_of_element_located((By.XPATH, "//div[@aria-placeholder='add caption']")))
-                                elif self.chosen_language.get() == "ar":
-                                    message_box = self.wait.until(EC.presence_of_element_located((By.XPATH, "//div[@aria-placeholder='إضافة شرح']")))
-                            except TimeoutException:
-                                    retries += 1
-                                    continue
-                            message_box.send_keys(Keys.ENTER)
-                        else:
-                            self.update_info_var(f"No photo chosen for {phone_number}")
-                            self.update_text_area(f"No photo chosen for {phone_number}")
-                            unsent_row += 1
-                            sheet_unsent.append([phone_number, message])  # Add unsent message
-                            wb_unsent.save("unsent_messages.xlsx")  # Save after each unsent message
-                            continue
-
-                    # Check message status
-                    status = self.check_message_status()
-                    self.update_text_area(f"Message/photo to {phone_number} {status}.")
-                    
-                    # Update sent and unsent logs accordingly
-                    if status == "Not Sent":
-                        unsent_row += 1
-                    else:
-                        sheet_sent.append([phone_number, message, status])  # Add sent message
-                        sheet_unsent.delete_rows(unsent_row)
-
-
-                    # Save both workbooks after each iteration
-                    wb_sent.save("sent_messages.xlsx")
-                    wb_unsent.save("unsent_messages.xlsx")
-
-                except (NoSuchElementException, TimeoutException, WebDriverException) as e:
-                    error_msg = f"Error for {phone_number}: {str(e)}"
-                    self.update_info_var(f"Error for {phone_number}")
-                    self.update_text_area(error_msg)
-                    unsent_row += 1
-                    wb_unsent.save("unsent_messages.xlsx")  # Save after each unsent message
-
-                time.sleep(2)
-
-                progress_value = (idx / total_rows) * 100
-                self.update_progress(progress_value)
-
-                elapsed_time = datetime.now() - start_time
-                estimated_total_time = (elapsed_time / idx) * total_rows
-                remaining_time = estimated_total_time - elapsed_time
-                self.time_var.set(f"Estimated Time Remaining: {str(remaining_time).split('.')[0]}")
+            if campaign.validate(scan_rows=validate_rows, resume=resume):
+                self.update_info_var("Fix the rows reported in the log before sending.")
+                return
+        except (TemplateError, OSError, ValueError) as e:
+            self.update_info_var("Pre-flight check failed!")
+            self.update_text_area(f"Pre-flight check failed: {str(e)}")
+            return
+        self.campaign = campaign
+        self.pool.pause(paused=self.pause_thread)
+        # Phase timings are rewritten to metrics.prom every few seconds for scraping or inspection
+        exporter = MetricsExporter(self.pool.metrics, path="metrics.prom").start()
+
+        try:
+            pipelined = settings.pop("pipelined")
+            pacing = settings.pop("pacing")
+            self.campaign.run(self.pool, settings, resume=resume, pipelined=pipelined, pacing=pacing,
+                              on_outcome=lambda row_id, status: self.report_progress())
+            if not self.stop_thread:
+                self.update_progress(100)
 
         except Exception as e:
             self.update_info_var(f"Error: {str(e)}")
             self.update_text_area(f"Error during message sending process: {str(e)}")
         finally:
-            self.driver.quit()
+            exporter.stop()
+            # Reports are built once from the journal instead of after every recipient
+            try:
+                self.campaign.export_reports()
+            except Exception as e:
+                self.update_text_area(f"Error writing reports: {str(e)}")
+            self.pool.stop()
+            self.pool.close()
+            self.pool = None
             self.update_info_var("Status: Done sending messages!")
             self.update_text_area("Finished sending messages.")
 
-
-
-
-
-
-    def check_message_status(self):
-        try:
-            self.wait.until(EC.presence_of_element_located((By.XPATH, "//span[@data-icon='msg-time']")))
-            self.update_text_area("Message is pending (msg-time). Waiting for final status...")
-        except TimeoutException:
-            pass
-
-        try:
-            self.wait.until_not(EC.presence_of_element_located((By.XPATH, "//span[@data-icon='msg-time']")))
-            self.update_text_area("Message is no longer pending (msg-time disappeared). Checking final status...")
-        except TimeoutException:
-            self.update_text_area("Message remained in pending state for too long. Assuming not sent.")
-            return "Not Sent"
-
-        icons = [
-            ("//span[@data-icon='msg-check']", "Sent"),
-            ("//span[@data-icon='msg-dblcheck']", "Delivered"),
-            ("//span[@data-icon='msg-dblcheck-ack']", "Read")
-        ]
-
-        retries = 0
-        while retries < 5:
-            for icon, state in icons:
-                try:
-                    self.wait.until(EC.presence_of_element_located((By.XPATH, icon)))
-                    self.update_text_area(f"Message status updated to: {state}")
-                    return state
-                except TimeoutException:
-                    continue
-
-            retries += 1
-            time.sleep(2)
-
-        self.update_text_area("No final status found after retries. Returning 'Not Sent'.")
-        return "Not Sent"
-
-    def pause_messages(self):
-        self.pause_thread = not self.pause_thread
-        if self.pause_thread:
-            self.update_info_var("Paused...")
-        else:
-            self.update_info_var("Resuming...")
-
-    def stop_messages(self):
-        self.stop_thread = True
-        self.update_info_var("Stopping...")
-        self.update_text_area("Attempting to stop the message sending process...")
+    def report_progress(self, campaign=None):
+        campaign = campaign or self.campaign
+        if campaign is None:
+            return
+        pacing = self.pool.pacing_summary()
+        self.update_pacing_var(pacing)
+        if campaign.done % 25 == 0:
+            self.update_text_area(pacing)
+            self.update_text_area(self.pool.metrics.describe())
+
+        progress_value, remaining_time = campaign.progress()
+        if progress_value is None:
+            return
+        self.update_progress(progress_value)
+        self.update_time_var(f"Estimated Time Remaining: {str(remaining_time).split('.')[0]}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,227 @@
+import bisect
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Where a recipient's time goes, in the order the phases happen
+PHASES = ("navigation", "compose_wait", "paste_send", "status_wait", "pacing_sleep")
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Weight of the newest interval in the ETA's moving average
+EWMA_ALPHA = 0.1
+
+
+class Histogram:
+    """Cumulative bucket counts for Prometheus plus a rolling window for percentiles."""
+
+    def __init__(self, window=1000):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = collections.deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+    def percentile(self, fraction):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+class Metrics:
+    """Per-phase timings, outcome counts and throughput of one campaign run.
+
+    Shared by every session of a pool; all methods are thread-safe. The ETA
+    uses an exponentially weighted moving average of the interval between
+    completed recipients, so it follows the current speed instead of the
+    average since the start.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.phases = {phase: Histogram() for phase in PHASES}
+            self.outcomes = collections.Counter()
+            self.started = time.monotonic()
+            self.last_completion = None
+            self.interval = None
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            self.phases[phase].observe(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - started)
+
+    def record_outcome(self, status, completed=True):
+        """Count an outcome; completed is False for a later update of a recipient already counted."""
+        now = time.monotonic()
+        with self._lock:
+            self.outcomes[status] += 1
+            if not completed:
+                return
+            previous = self.last_completion if self.last_completion is not None else self.started
+            self.last_completion = now
+            if self.interval is None:
+                self.interval = now - previous
+            else:
+                self.interval += EWMA_ALPHA * ((now - previous) - self.interval)
+
+    def eta(self, remaining):
+        """Seconds until remaining more recipients complete at the current speed, or None."""
+        with self._lock:
+            if self.interval is None:
+                return None
+            return self.interval * max(0, remaining)
+
+    @property
+    def rate(self):
+        """Current recipients per minute across all sessions."""
+        with self._lock:
+            return 60.0 / self.interval if self.interval else None
+
+    def describe(self):
+        parts = []
+        with self._lock:
+            for phase, histogram in self.phases.items():
+                p50 = histogram.percentile(0.50)
+                if p50 is not None:
+                    parts.append(f"{phase} p50 {p50:.2f}s")
+        return "Timings: " + (", ".join(parts) if parts else "none yet")
+
+    def to_dict(self):
+        rate = self.rate
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.monotonic() - self.started, 3),
+                "rate_per_minute": round(rate, 2) if rate else None,
+                "outcomes": dict(self.outcomes),
+                "phases": {phase: histogram.summary() for phase, histogram in self.phases.items()},
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        lines = [
+            "# HELP whatsapp_sender_phase_seconds Time spent per recipient in each phase.",
+            "# TYPE whatsapp_sender_phase_seconds histogram",
+        ]
+        rate = self.rate
+        with self._lock:
+            for phase, histogram in self.phases.items():
+                cumulative = 0
+                for bound, count in zip([*BUCKETS, "+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f'whatsapp_sender_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+                lines.append(f'whatsapp_sender_phase_seconds_sum{{phase="{phase}"}} {histogram.sum:.6f}')
+                lines.append(f'whatsapp_sender_phase_seconds_count{{phase="{phase}"}} {histogram.count}')
+            lines.append("# HELP whatsapp_sender_outcomes_total Recipients finished, by status.")
+            lines.append("# TYPE whatsapp_sender_outcomes_total counter")
+            for status, count in sorted(self.outcomes.items()):
+                lines.append(f'whatsapp_sender_outcomes_total{{status="{status}"}} {count}')
+        lines.append("# HELP whatsapp_sender_rate_per_minute Recipients per minute, moving average.")
+        lines.append("# TYPE whatsapp_sender_rate_per_minute gauge")
+        lines.append(f"whatsapp_sender_rate_per_minute {rate or 0:.3f}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Publishes a Metrics object to a file every interval seconds and/or over local HTTP.
+
+    Files ending in .json get JSON, anything else Prometheus text. The HTTP
+    endpoint serves /metrics (Prometheus) and /metrics.json on 127.0.0.1.
+    """
+
+    def __init__(self, metrics, path=None, port=None, interval=5.0):
+        self.metrics = metrics
+        self.path = path
+        self.port = port
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def start(self):
+        if self.path:
+            self._thread = threading.Thread(target=self._write_loop, daemon=True)
+            self._thread.start()
+        if self.port is not None:
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.port), self._handler())
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def write(self):
+        body = self.metrics.to_json() if self.path.endswith(".json") else self.metrics.to_prometheus()
+        # Write then rename so a scraper never reads a half-written file
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            f.write(body)
+        os.replace(temporary_path, self.path)
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+        self.write()
+
+    def _handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = metrics.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = metrics.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,213 @@
+"""Local stand-in for WhatsApp Web, for benchmarks and offline testing.
+
+Serves one page that behaves like a logged-in WhatsApp Web session as far as
+the sender can tell: a chat list, a compose box per chat, in-app routing of
+send?phone= links, an attach menu with hidden file inputs and a caption box,
+and outgoing messages whose status icon goes msg-time -> msg-check -> msg-dblcheck.
+
+    python mockwhatsapp.py --port 8000 --fail-rate 0.05 --delivered-delay 800
+
+Point a WorkerPool or WhatsAppSender at it with base_url="http://127.0.0.1:8000/".
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Mean delays in milliseconds, each randomized to 50-150% of the value by the page
+DEFAULT_CONFIG = {
+    "page_delay": 300,       # full page load, applied by the server
+    "open_delay": 150,       # chat opening after navigation
+    "sent_delay": 300,       # msg-time -> msg-check
+    "delivered_delay": 600,  # msg-check -> msg-dblcheck
+    "fail_rate": 0.0,        # messages stuck on msg-time forever
+    "invalid_rate": 0.0,     # numbers whose chat never opens
+    "language": "en",
+}
+
+PAGE = """<!DOCTYPE html>
+<html lang="%(language)s">
+<head><meta charset="utf-8"><title>WhatsApp</title></head>
+<body>
+<div id="app">
+  <div id="side"><div id="pane-side"></div></div>
+  <div id="main"></div>
+</div>
+<script>
+var config = %(config)s;
+var main = document.getElementById('main');
+
+function later(mean, callback) {
+    setTimeout(callback, mean * (0.5 + Math.random()));
+}
+
+function phoneFrom(url) {
+    var match = /[?&]phone=([^&]*)/.exec(url);
+    return match ? decodeURIComponent(match[1]) : null;
+}
+
+function addMessage(messages, text) {
+    var row = document.createElement('div');
+    row.className = 'message-out';
+    row.textContent = text;
+    var icon = document.createElement('span');
+    icon.setAttribute('data-icon', 'msg-time');
+    row.appendChild(icon);
+    messages.appendChild(row);
+    if (Math.random() < config.fail_rate) { return; }
+    later(config.sent_delay, function () {
+        icon.setAttribute('data-icon', 'msg-check');
+        later(config.delivered_delay, function () { icon.setAttribute('data-icon', 'msg-dblcheck'); });
+    });
+}
+
+function openCaption(messages, files) {
+    var media = document.createElement('div');
+    media.id = 'media';
+    var caption = document.createElement('div');
+    caption.setAttribute('contenteditable', 'true');
+    caption.setAttribute('aria-placeholder', 'add caption');
+    caption.addEventListener('keydown', function (event) {
+        if (event.key !== 'Enter') { return; }
+        event.preventDefault();
+        media.remove();
+        addMessage(messages, '[' + files + '] ' + caption.textContent);
+    });
+    media.appendChild(caption);
+    document.body.appendChild(media);
+}
+
+function openChat(phone) {
+    // The old chat goes away at once, as it does in WhatsApp Web
+    main.innerHTML = '';
+    if (!phone || Math.random() < config.invalid_rate) { return; }
+    later(config.open_delay, function () {
+        if (phoneFrom(location.href) !== phone) { return; }
+        var messages = document.createElement('div');
+        var footer = document.createElement('footer');
+        var attach = document.createElement('span');
+        attach.setAttribute('data-icon', 'plus');
+        attach.addEventListener('click', function () {
+            [['image/*,video/mp4', 'media'], ['*', 'document']].forEach(function (kind) {
+                var input = document.createElement('input');
+                input.type = 'file';
+                input.multiple = true;
+                input.accept = kind[0];
+                input.style.display = 'none';
+                input.addEventListener('change', function () {
+                    openCaption(messages, input.files.length + ' ' + kind[1]);
+                });
+                footer.appendChild(input);
+            });
+        });
+        var box = document.createElement('div');
+        box.setAttribute('contenteditable', 'true');
+        box.setAttribute('aria-placeholder', 'Type a message');
+        box.addEventListener('keydown', function (event) {
+            if (event.key !== 'Enter') { return; }
+            event.preventDefault();
+            addMessage(messages, box.textContent);
+            box.textContent = '';
+        });
+        footer.appendChild(attach);
+        footer.appendChild(box);
+        main.appendChild(messages);
+        main.appendChild(footer);
+    });
+}
+
+document.addEventListener('click', function (event) {
+    var link = event.target.closest('a');
+    if (!link || link.href.indexOf('/send?') === -1) { return; }
+    event.preventDefault();
+    history.pushState(null, '', link.href);
+    openChat(phoneFrom(link.href));
+}, true);
+
+openChat(phoneFrom(location.href));
+</script>
+</body>
+</html>
+"""
+
+
+class MockWhatsAppServer:
+    """Serves the mock page from a background thread and counts full page loads."""
+
+    def __init__(self, host="127.0.0.1", port=0, **config):
+        unknown = set(config) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown mock settings: {', '.join(sorted(unknown))}")
+        self.config = {**DEFAULT_CONFIG, **config}
+        self.page_loads = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def page(self):
+        return PAGE % {"language": self.config["language"], "config": json.dumps(self.config)}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/favicon"):
+                    self.send_error(404)
+                    return
+                with mock._lock:
+                    mock.page_loads += 1
+                time.sleep(mock.config["page_delay"] / 1000)
+                body = mock.page().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    for name, default in DEFAULT_CONFIG.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    args = vars(parser.parse_args())
+    server = MockWhatsAppServer(args.pop("host"), args.pop("port"), **args)
+    server.start()
+    print(f"Mock WhatsApp Web at {server.url}", flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
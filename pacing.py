@@ -0,0 +1,136 @@
+import collections
+import random
+import time
+
+
+# Default ceiling for one session, in messages per minute
+DEFAULT_RATE = 20
+
+# Pause after every recipient in fixed mode, in seconds (the original behaviour)
+FIXED_DELAY = 2
+
+
+class TokenBucket:
+    """Paces sends to a messages-per-minute rate with random jitter.
+
+    Tokens accrue while a message is being sent, so the time a send takes
+    counts toward the interval instead of being added on top of a fixed sleep.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, jitter=0.25, burst=1, log=None):
+        self.rate = rate
+        self.jitter = jitter
+        self.burst = burst
+        self.log = log or (lambda message: None)
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.outcomes = collections.deque(maxlen=20)
+
+    @property
+    def interval(self):
+        return 60.0 / self.rate
+
+    @property
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.interval)
+        self.updated = now
+
+    def wait(self, cancelled=None):
+        """Block until the next send is allowed; returns False if cancelled() became true."""
+        self._refill()
+        delay = (1 - self.tokens) * self.interval if self.tokens < 1 else 0
+        delay += random.uniform(0, self.jitter * self.interval)
+        deadline = time.monotonic() + delay
+        while time.monotonic() < deadline:
+            if cancelled and cancelled():
+                return False
+            time.sleep(min(0.25, deadline - time.monotonic()))
+        self._refill()
+        self.tokens = max(0.0, self.tokens - 1)
+        return True
+
+    def record(self, success):
+        self.outcomes.append(success)
+
+    def describe(self):
+        return f"{self.rate:.1f} msg/min, {self.error_rate:.0%} errors"
+
+
+class AdaptivePacer(TokenBucket):
+    """Token bucket that halves its rate when failures pile up and recovers on clean sends.
+
+    The configured rate is the ceiling; the pacer never goes above it and never
+    drops below min_rate.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, jitter=0.25, burst=1, min_rate=None,
+                 backoff_error_rate=0.3, recovery_streak=10, log=None):
+        super().__init__(rate, jitter, burst, log)
+        self.max_rate = rate
+        self.min_rate = min_rate or max(1.0, rate / 8)
+        self.backoff_error_rate = backoff_error_rate
+        self.recovery_streak = recovery_streak
+        self.streak = 0
+
+    def record(self, success):
+        super().record(success)
+        self.streak = self.streak + 1 if success else 0
+
+        if len(self.outcomes) >= 5 and self.error_rate >= self.backoff_error_rate and self.rate > self.min_rate:
+            self._set_rate(max(self.min_rate, self.rate / 2), "backing off")
+            # Judge the new rate on fresh outcomes only
+            self.outcomes.clear()
+        elif self.streak >= self.recovery_streak and self.rate < self.max_rate:
+            self._set_rate(min(self.max_rate, self.rate * 1.25), "speeding up")
+            self.streak = 0
+
+    def _set_rate(self, rate, reason):
+        self.log(f"Pacing {reason}: {self.rate:.1f} -> {rate:.1f} msg/min ({self.error_rate:.0%} errors).")
+        self.rate = rate
+
+
+class FixedDelay(TokenBucket):
+    """The original behaviour: a constant pause after every recipient."""
+
+    def __init__(self, delay=FIXED_DELAY, log=None):
+        # No delay means no pause at all; the rate is only reported, never used to wait
+        super().__init__(rate=60.0 / delay if delay > 0 else 0, jitter=0, log=log)
+        self.delay = delay
+        self.started = False
+
+    def wait(self, cancelled=None):
+        if not self.started:
+            self.started = True
+            return True
+        deadline = time.monotonic() + self.delay
+        while time.monotonic() < deadline:
+            if cancelled and cancelled():
+                return False
+            time.sleep(min(0.25, deadline - time.monotonic()))
+        return True
+
+    def describe(self):
+        return f"{self.delay:g}s between recipients, {self.error_rate:.0%} errors"
+
+
+PACERS = {
+    "adaptive": AdaptivePacer,
+    "bucket": TokenBucket,
+}
+
+
+def make_pacer(mode="adaptive", rate=DEFAULT_RATE, jitter=0.25, delay=FIXED_DELAY, log=None):
+    """Build a session's pacer; rate and jitter apply to the token buckets, delay to fixed mode."""
+    if mode == "fixed":
+        if delay < 0:
+            raise ValueError(f"Delay must not be negative, got {delay:g}")
+        return FixedDelay(delay, log=log)
+    if rate <= 0:
+        raise ValueError(f"Rate must be above 0 messages per minute, got {rate:g}")
+    return PACERS[mode](rate=rate, jitter=jitter, log=log)
@@ -0,0 +1,111 @@
+import re
+import unicodedata
+
+
+INVALID = "Invalid Number"
+DUPLICATE = "Duplicate"
+
+# E.164 allows at most 15 digits; anything under 8 cannot be a full international number
+MIN_DIGITS, MAX_DIGITS = 8, 15
+
+# Mobile number length without the country code, for countries where it is fixed. A
+# number of exactly this length is national even when Excel dropped its trunk 0.
+NATIONAL_LENGTHS = {
+    "1": 10, "20": 10, "33": 9, "34": 9, "44": 10, "61": 9, "90": 10, "91": 10, "92": 10,
+    "212": 9, "213": 9, "216": 8, "962": 9, "965": 8, "966": 9, "968": 8, "971": 9, "973": 8, "974": 8,
+}
+
+# \d would also match Arabic-Indic and other non-ASCII digits
+_NON_DIGITS = re.compile(r"[^0-9]")
+
+
+def ascii_digits(text):
+    """Replace Arabic-Indic and other Unicode decimal digits with 0-9."""
+    if text.isascii():
+        return text
+    return "".join(str(unicodedata.decimal(char)) if char.isdecimal() else char for char in text)
+
+
+class RejectedNumber(ValueError):
+    """Raised for a row whose number is dropped before sending; status is the journal label."""
+
+    def __init__(self, status, phone_number):
+        super().__init__(f"{status}: {phone_number}")
+        self.status = status
+        self.phone_number = phone_number
+
+
+def normalize_phone(value, default_country_code=None):
+    """Return the number as E.164 digits without the "+", or None if it cannot be one.
+
+    Handles numbers Excel stored as floats (9665...0.0 or 9.665e+11), spaces,
+    dashes and brackets, Arabic-Indic digits, and "+" and "00" international
+    prefixes. With default_country_code, national numbers get the code added:
+    those with a leading trunk 0, and those of exactly the country's national
+    length (NATIONAL_LENGTHS). Any other number is taken as international
+    already, so 14155552671 stays as it is.
+    """
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if not value.is_integer():
+            return None
+        value = int(value)
+    text = ascii_digits(str(value).strip())
+    if re.fullmatch(r"\d+(\.0+)?|\d(\.\d+)?[eE]\+?\d+", text):
+        text = str(int(float(text))) if "e" in text.lower() else text.split(".")[0]
+
+    international = text.startswith("+")
+    digits = _NON_DIGITS.sub("", text)
+    if not international and digits.startswith("00"):
+        digits, international = digits[2:], True
+
+    if not international and default_country_code:
+        country_code = _NON_DIGITS.sub("", str(default_country_code))
+        if digits.startswith("0"):
+            digits = country_code + digits.lstrip("0")
+        elif len(digits) == NATIONAL_LENGTHS.get(country_code):
+            digits = country_code + digits
+
+    if not MIN_DIGITS <= len(digits) <= MAX_DIGITS or digits.startswith("0"):
+        return None
+    return digits
+
+
+class PhoneFilter:
+    """Pre-flight check run on every row before it reaches a browser.
+
+    Normalizes each number and rejects malformed ones and repeats of a number
+    already seen, using a set of ints as the hash index.
+    """
+
+    def __init__(self, default_country_code=None):
+        self.default_country_code = default_country_code
+        self.seen = set()
+        self.invalid = 0
+        self.duplicates = 0
+
+    def add_seen(self, phone_number):
+        """Mark a number from the journal as seen; it was stored already normalized."""
+        if phone_number and str(phone_number).isdigit():
+            self.seen.add(int(phone_number))
+
+    def check(self, value):
+        """Return (normalized number, None) or (None, INVALID / DUPLICATE)."""
+        normalized = normalize_phone(value, self.default_country_code)
+        if normalized is None:
+            self.invalid += 1
+            return None, INVALID
+        key = int(normalized)
+        if key in self.seen:
+            self.duplicates += 1
+            return None, DUPLICATE
+        self.seen.add(key)
+        return normalized, None
+
+    @property
+    def removed(self):
+        return self.invalid + self.duplicates
+
+    def describe(self):
+        return f"Pre-flight removed {self.removed} row(s): {self.invalid} invalid, {self.duplicates} duplicate."
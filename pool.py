@@ -0,0 +1,462 @@
+import collections
+import os
+import queue
+import threading
+import time
+
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+
+from journal import FAILED, SENT, SUBMITTED, state_for
+from metrics import Metrics
+from pacing import make_pacer
+from phones import RejectedNumber
+from sender import WHATSAPP_URL, WhatsAppSender, clear_prepared_attachments, is_driver_alive, launch_driver
+from verifier import DeliveryVerifier
+
+
+# How many times a recipient is retried on a fresh driver after its session crashed
+MAX_ATTEMPTS = 3
+
+
+def profile_dir(index, root=None):
+    # Session 1 keeps the original profile directory so an existing login carries over
+    name = "whatsapp_session" if index == 0 else f"whatsapp_session_{index + 1}"
+    return os.path.join(root or os.getcwd(), name)
+
+
+class SessionWorker:
+    """One browser session with its own Chrome profile and linked account."""
+
+    def __init__(self, index, pool):
+        self.index = index
+        self.pool = pool
+        self.profile_dir = profile_dir(index, pool.profile_root)
+        self.driver = None
+        self.thread = None
+        self.paused = False
+        self.stopped = False
+        self.state = "closed"
+        self.sent = 0
+        self.failed = 0
+        self.restarts = 0
+        self.last_error = ""
+        self.last_activity = None
+        self.sender = None
+        self.verifier = None
+        self.pacer = None
+        self.current = None  # In-flight (row_id, values), requeued if the driver dies
+
+    @property
+    def name(self):
+        return f"Session {self.index + 1}"
+
+    def open(self):
+        self.driver = launch_driver(self.pool.webdriver_path, self.profile_dir, self.pool.headless)
+        self.driver.get(self.pool.base_url)
+        self.state = "ready"
+
+    def wait_for_login(self, timeout, screenshot_path=None):
+        """Block until the chat list shows; returns False after timeout seconds.
+
+        In headless mode nobody can see the QR code, so a screenshot of the login
+        page is saved to screenshot_path for scanning.
+        """
+        deadline = time.time() + timeout
+        screenshot_taken = False
+        while time.time() < deadline:
+            if self.driver.find_elements(By.ID, "pane-side"):
+                self.state = "ready"
+                return True
+            if screenshot_path and not screenshot_taken and self.driver.find_elements(By.TAG_NAME, "canvas"):
+                self.driver.save_screenshot(screenshot_path)
+                screenshot_taken = True
+                self.pool.log(f"{self.name}: not logged in; scan the QR code saved to {screenshot_path}.")
+            time.sleep(1)
+        return False
+
+    def close(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass
+        self.driver = None
+        self.state = "closed"
+
+    def restart(self):
+        """Relaunch the driver on the same profile; the WhatsApp login is kept in the profile."""
+        self.close()
+        self.restarts += 1
+        self.state = "restarting"
+        self.open()
+        self.pool.log(f"{self.name}: driver restarted.")
+
+    def start(self):
+        self.sender = None
+        self.verifier = None
+        self.pacer = make_pacer(log=lambda message: self.pool.log(f"{self.name}: {message}"), **self.pool.pacing)
+        # A pause set before the run (or between scheduled campaigns) stays in effect until resumed
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def ensure_sender(self):
+        pool = self.pool
+        if self.sender is None or self.sender.driver is not self.driver:
+            self.sender = WhatsAppSender(self.driver, base_url=pool.base_url, metrics=pool.metrics, log=pool.log,
+                                         info=pool.info, **pool.settings)
+            if pool.pipelined:
+                if self.verifier is None:
+                    self.verifier = DeliveryVerifier(self.sender, self.record, log=pool.log)
+                self.verifier.sender = self.sender
+        return self.sender
+
+    def run(self):
+        pool = self.pool
+        try:
+            while not self.stopped:
+                if self.paused:
+                    self.state = "paused"
+                    time.sleep(1)
+                    continue
+                item = pool.next_item()
+                if item is None:
+                    if pool.feeding_done and pool.is_drained():
+                        break
+                    continue
+                with pool.metrics.timer("pacing_sleep"):
+                    ready = self.pacer.wait(cancelled=lambda: self.stopped or self.paused)
+                if not ready:
+                    # Paused or stopped while waiting for a send slot; hand the recipient back
+                    pool.retry.appendleft(item)
+                    continue
+
+                self.current = item
+                self.state = "sending"
+                self.last_activity = time.time()
+                try:
+                    self.process(item)
+                finally:
+                    self.current = None
+                if self.verifier and self.verifier.due():
+                    self.state = "verifying"
+                    self.verify(final=False)
+
+            if self.verifier and self.verifier.pending:
+                self.state = "verifying"
+                self.verify(final=True)
+        except WebDriverException as e:
+            # Driver could not be restarted; leave the recipient for the other sessions
+            self.last_error = str(e)
+            self.state = "dead"
+            pool.log(f"{self.name}: could not restart driver: {str(e)}")
+            return
+
+        self.state = "stopped" if self.stopped else "finished"
+
+    def process(self, item):
+        pool = self.pool
+        row_id, values = item
+        phone_number, message, *rest = values
+        phone_number = str(phone_number)
+        message = str(message)
+        attachments = rest[0] if rest else None
+
+        sender = self.ensure_sender()
+        try:
+            status = sender.send(phone_number, message, confirm=not pool.pipelined, attachments=attachments)
+        except (NoSuchElementException, TimeoutException, WebDriverException) as e:
+            self.last_error = str(e)
+            if not is_driver_alive(self.driver) and pool.requeue(item):
+                pool.log(f"{self.name} crashed while sending to {phone_number}; requeued.")
+                self.state = "crashed"
+                self.restart()
+                return
+            pool.info(f"Error for {phone_number}")
+            pool.log(f"Error for {phone_number}: {str(e)}")
+            status = "Not Sent"
+        except Exception as e:
+            self.last_error = str(e)
+            pool.log(f"Error for {phone_number}: {str(e)}")
+            status = "Not Sent"
+
+        pool.log(f"Message/photo to {phone_number} {status}.")
+        if status == SUBMITTED:
+            self.verifier.submit(row_id, phone_number, message)
+        self.record(row_id, phone_number, message, status)
+
+    def verify(self, final):
+        """Run a verification pass, restarting the driver if it died underneath the verifier."""
+        for _ in range(MAX_ATTEMPTS):
+            try:
+                if final:
+                    self.verifier.drain()
+                else:
+                    self.verifier.verify_batch()
+                return
+            except WebDriverException as e:
+                self.last_error = str(e)
+                if is_driver_alive(self.driver):
+                    self.pool.log(f"{self.name}: verification error: {str(e)}")
+                    if not final:
+                        return
+                else:
+                    self.state = "crashed"
+                    self.restart()
+                    self.ensure_sender()
+
+    def record(self, row_id, phone_number, message, status):
+        state = state_for(status)
+        if state == SENT:
+            self.sent += 1
+        elif state == FAILED:
+            self.failed += 1
+        # A pipelined send is fed to the pacer once, when its verified outcome comes in
+        if status != SUBMITTED:
+            self.pacer.record(state != FAILED)
+        self.pool.record(row_id, phone_number, message, status)
+
+    def health(self):
+        idle = time.time() - self.last_activity if self.last_activity else None
+        return {
+            "session": self.index + 1,
+            "state": self.state,
+            "running": self.is_running(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "restarts": self.restarts,
+            "pacing": self.pacer.describe() if self.pacer else "",
+            "idle_seconds": idle,
+            "last_error": self.last_error,
+        }
+
+
+class WorkerPool:
+    """Shards contacts across N browser sessions through one shared work queue.
+
+    A bounded queue keeps only a few rows per session in memory while the
+    contact source is streamed in, and every outcome goes to one journal.
+    """
+
+    def __init__(self, webdriver_path, size, journal, log=None, info=None, headless=False, profile_root=None,
+                 base_url=WHATSAPP_URL):
+        self.webdriver_path = webdriver_path
+        self.base_url = base_url
+        self.headless = headless
+        self.profile_root = profile_root
+        self.journal = journal
+        self.log = log or (lambda message: None)
+        self.info = info or (lambda message: None)
+        self.workers = [SessionWorker(index, self) for index in range(size)]
+        self.queue = queue.Queue(maxsize=size * 4)
+        self.retry = collections.deque()
+        self.attempts = {}
+        self.settings = {}
+        self.pipelined = False
+        self.pacing = {}
+        self.metrics = Metrics()
+        self.campaign = None
+        self.recipients = None
+        self.fingerprint = None
+        self.on_outcome = None
+        self.feeding_done = False
+        self.stop_requested = False
+        self._record_lock = threading.Lock()
+        # Checkpoint bookkeeping: fed rows awaiting an outcome, in feed order, with
+        # the source offset just past each one. Bounded by the rows in flight.
+        self.fed = collections.deque()
+        self.in_flight = set()
+        self.completed = set()
+
+    def open_sessions(self):
+        """Launch every browser session; returns the workers that failed to start."""
+        failed = []
+        for worker in self.workers:
+            try:
+                worker.open()
+                self.log(f"{worker.name}: opened WhatsApp Web with profile {worker.profile_dir}.")
+            except WebDriverException as e:
+                worker.last_error = str(e)
+                worker.state = "dead"
+                failed.append(worker)
+                self.log(f"{worker.name}: failed to launch WebDriver: {str(e)}")
+        return failed
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    def active_workers(self):
+        return [worker for worker in self.workers if worker.driver]
+
+    def run(self, source, campaign, recipients, settings, on_outcome=None, pipelined=False, pacing=None,
+            prepare=None):
+        """Feed the contact source through the queue and block until every session is done.
+
+        pacing holds make_pacer arguments; every session gets its own pacer since
+        each one sends from a separate account. prepare, if given, turns a row's
+        values into (phone_number, message) or (phone_number, message, attachments)
+        as it is fed, e.g. to render a template; without it the first two columns are used.
+        """
+        self.campaign = campaign
+        self.recipients = recipients
+        # Stored with every checkpoint so a resume can detect an edited file
+        self.fingerprint = getattr(source, "fingerprint", None)
+        self.settings = settings
+        self.pipelined = pipelined
+        self.pacing = pacing or {}
+        self.on_outcome = on_outcome
+        self.feeding_done = False
+        self.stop_requested = False
+        self.metrics.reset()
+        self.attempts.clear()
+        self.retry.clear()
+        self.fed.clear()
+        self.in_flight.clear()
+        self.completed.clear()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+        try:
+            for worker in self.active_workers():
+                worker.start()
+
+            for item in source:
+                row_id = item[0]
+                with self._record_lock:
+                    self.fed.append((row_id, getattr(source, "offset", None)))
+                    self.in_flight.add(row_id)
+                    if not recipients.is_pending(row_id):
+                        # Already has an outcome from before the resume; never send it twice
+                        self._complete(row_id)
+                        continue
+                if prepare:
+                    try:
+                        item = (row_id, prepare(item[1]))
+                    except RejectedNumber as e:
+                        # Dropped by the pre-flight check; journaled without touching a browser
+                        self.record(row_id, "" if e.phone_number is None else str(e.phone_number), "", e.status)
+                        continue
+                    except Exception as e:
+                        self.log(f"Could not prepare row {row_id}: {str(e)}")
+                        self.record(row_id, str(item[1][0]) if item[1] else "", "", "Not Sent")
+                        continue
+                else:
+                    item = (row_id, item[1][:2])
+                if not self._put(item):
+                    break
+            self.feeding_done = True
+
+            self.wait()
+        finally:
+            # Downscaled attachment copies only live as long as the run
+            clear_prepared_attachments()
+
+    def wait(self):
+        # Poll rather than join so sessions restarted mid-run are waited for too
+        while any(worker.is_running() for worker in self.workers):
+            time.sleep(0.5)
+
+    def _put(self, item):
+        while not self.stop_requested:
+            if not any(worker.is_running() for worker in self.workers):
+                return False
+            try:
+                self.queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def next_item(self):
+        if self.retry:
+            try:
+                return self.retry.popleft()
+            except IndexError:
+                pass
+        try:
+            item = self.queue.get(timeout=1)
+        except queue.Empty:
+            return None
+        self.queue.task_done()
+        return item
+
+    def is_drained(self):
+        return self.queue.empty() and not self.retry
+
+    def requeue(self, item):
+        """Put an in-flight recipient back for another attempt; False once it has used them all."""
+        row_id = item[0]
+        self.attempts[row_id] = self.attempts.get(row_id, 1) + 1
+        if self.attempts[row_id] > MAX_ATTEMPTS:
+            return False
+        self.retry.append(item)
+        return True
+
+    def record(self, row_id, phone_number, message, status):
+        with self._record_lock:
+            self.journal.record(self.campaign, row_id, phone_number, message, status)
+            # A verified pipelined send was already counted when it was submitted
+            self.metrics.record_outcome(status, completed=self.recipients.is_pending(row_id))
+            self.recipients.mark(row_id, state_for(status))
+            self._complete(row_id)
+        if self.on_outcome:
+            self.on_outcome(row_id, status)
+
+    def _complete(self, row_id):
+        """Advance the checkpoint past every leading fed row that now has an outcome."""
+        if row_id not in self.in_flight:
+            return
+        self.in_flight.discard(row_id)
+        self.completed.add(row_id)
+        checkpoint = None
+        while self.fed and self.fed[0][0] in self.completed:
+            checkpoint = self.fed.popleft()
+            self.completed.discard(checkpoint[0])
+        if checkpoint:
+            self.journal.checkpoint(self.campaign, *checkpoint, fingerprint=self.fingerprint)
+
+    def pause(self, index=None, paused=True):
+        for worker in self._select(index):
+            worker.paused = paused
+
+    def stop(self, index=None):
+        if index is None:
+            self.stop_requested = True
+        for worker in self._select(index):
+            worker.stopped = True
+
+    def restart(self, index):
+        """Relaunch a crashed or stopped session and put it back to work if a run is in progress."""
+        worker = self.workers[index]
+        if worker.is_running():
+            self.log(f"{worker.name} is still running; stop it before restarting.")
+            return False
+        try:
+            worker.restart()
+        except WebDriverException as e:
+            worker.last_error = str(e)
+            worker.state = "dead"
+            self.log(f"{worker.name}: failed to launch WebDriver: {str(e)}")
+            return False
+        if self.campaign is not None and not self.stop_requested and not (self.feeding_done and self.is_drained()):
+            worker.start()
+        return True
+
+    def health(self):
+        return [worker.health() for worker in self.workers]
+
+    def pacing_summary(self):
+        pacers = [worker.pacer for worker in self.workers if worker.pacer and worker.is_running()]
+        if not pacers:
+            return "Pacing: --"
+        rate = sum(pacer.rate for pacer in pacers)
+        error_rate = sum(pacer.error_rate for pacer in pacers) / len(pacers)
+        return f"Pacing: {rate:.1f} msg/min across {len(pacers)} session(s), {error_rate:.0%} errors"
+
+    def _select(self, index):
+        return self.workers if index is None else [self.workers[index]]
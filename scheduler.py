@@ -0,0 +1,472 @@
+"""Scheduled campaigns: a persistent queue run by priority within daily send windows.
+
+    python scheduler.py add contacts.csv --priority 10 --window 09:00-21:00 --rate 30
+    python scheduler.py add alerts.csv --priority 100 --template alert.txt
+    python scheduler.py list
+    python scheduler.py cancel 3
+    python scheduler.py run --sessions 2
+
+Higher priorities run first. A running campaign is pre-empted as soon as a
+higher-priority one becomes eligible or its own window closes, and continues
+later from its checkpoint; campaigns of equal priority take turns every
+--slice minutes. Campaigns can be added while the scheduler runs, from another
+shell or from the GUI.
+"""
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from engine import Campaign
+from journal import campaign_id
+from pacing import DEFAULT_RATE, FIXED_DELAY
+from templates import MessageTemplate, TemplateError
+
+
+QUEUED, RUNNING, DONE, CANCELLED, FAILED = "queued", "running", "done", "cancelled", "failed"
+
+# How often the running campaign is checked for pre-emption, in seconds
+POLL_INTERVAL = 5
+
+# How long a campaign runs before yielding to another of the same priority, in minutes
+SLICE_MINUTES = 30
+
+# A running campaign whose scheduler has not checked in for this long is taken to have died, in seconds
+STALE_SECONDS = 60
+
+
+class SendWindow:
+    """Daily time window such as 09:00-21:00; a window like 22:00-06:00 wraps past midnight."""
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def parse(cls, text):
+        try:
+            start, end = (datetime.strptime(part.strip(), "%H:%M").time() for part in text.split("-"))
+        except ValueError as e:
+            raise ValueError(f"Invalid send window '{text}'; expected HH:MM-HH:MM") from e
+        return cls(start, end)
+
+    def is_open(self, now):
+        current = now.time()
+        if self.start <= self.end:
+            return self.start <= current < self.end
+        return current >= self.start or current < self.end
+
+    def __str__(self):
+        return f"{self.start:%H:%M}-{self.end:%H:%M}"
+
+
+class Job:
+    """One queued campaign, as stored in the jobs table."""
+
+    def __init__(self, id, filepath, priority, send_window, rate, settings, state, resume, created_at, last_run_at,
+                 finished_at, owner):
+        self.id = id
+        self.filepath = filepath
+        self.priority = priority
+        self.window = SendWindow.parse(send_window) if send_window else None
+        self.rate = rate
+        self.settings = json.loads(settings)
+        self.state = state
+        self.resume = bool(resume)
+        self.created_at = created_at
+        self.last_run_at = last_run_at
+        self.finished_at = finished_at
+        self.owner = owner
+
+    def is_open(self, now):
+        return self.window is None or self.window.is_open(now)
+
+    def describe(self):
+        window = f", window {self.window}" if self.window else ""
+        return f"#{self.id} {self.filepath} (priority {self.priority}{window}, {self.rate:g}/min, {self.state})"
+
+
+class CampaignQueue:
+    """Persistent queue of scheduled campaigns, kept in SQLite next to the result journal.
+
+    Each process opens its own connection, so campaigns can be added or
+    cancelled from another shell while a scheduler is running. A running
+    campaign is owned by the scheduler that claimed it, which refreshes
+    last_run_at as a heartbeat; only campaigns whose owner stopped checking in
+    are taken over by another scheduler.
+    """
+
+    def __init__(self, path="results_journal.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, filepath TEXT, priority INTEGER, send_window TEXT, rate REAL,"
+            " settings TEXT, state TEXT, resume INTEGER, created_at REAL, last_run_at REAL, finished_at REAL,"
+            " owner TEXT)"
+        )
+
+    def add(self, filepath, priority=0, window=None, rate=DEFAULT_RATE, settings=None, resume=False):
+        """Queue a campaign and return its id; a file can only be queued once at a time."""
+        if window:
+            SendWindow.parse(window)
+        if rate <= 0:
+            raise ValueError(f"Rate must be above 0 messages per minute, got {rate:g}")
+        filepath = campaign_id(filepath)
+        with self._lock:
+            if self._conn.execute(
+                "SELECT 1 FROM jobs WHERE filepath = ? AND state IN (?, ?)", (filepath, QUEUED, RUNNING)
+            ).fetchone():
+                raise ValueError(f"{filepath} is already queued")
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (filepath, priority, send_window, rate, settings, state, resume, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (filepath, priority, window or None, rate, json.dumps(settings or {}), QUEUED, int(resume),
+                 time.time()),
+            )
+            return cursor.lastrowid
+
+    def jobs(self, states=None):
+        """Return jobs in the given states (all by default), most urgent first."""
+        query = "SELECT * FROM jobs"
+        params = ()
+        if states:
+            query += f" WHERE state IN ({', '.join('?' * len(states))})"
+            params = tuple(states)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY priority DESC, id", params).fetchall()
+        return [Job(*row) for row in rows]
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(*row) if row else None
+
+    def update(self, job_id, from_state=None, **fields):
+        """Set fields of a job, with from_state only while it is still in that state; True if it was updated."""
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        query = f"UPDATE jobs SET {assignments} WHERE id = ?"
+        params = (*fields.values(), job_id)
+        if from_state:
+            query += " AND state = ?"
+            params += (from_state,)
+        with self._lock:
+            return self._conn.execute(query, params).rowcount > 0
+
+    def cancel(self, job_id):
+        """Cancel a queued or running campaign; a running one stops at the scheduler's next check."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ? WHERE id = ? AND state IN (?, ?)", (CANCELLED, job_id, QUEUED, RUNNING)
+            )
+            return cursor.rowcount > 0
+
+    def claim(self, job_id, owner):
+        """Mark a queued campaign as running for owner; False if another scheduler got to it first."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, owner = ?, last_run_at = ? WHERE id = ? AND state = ?",
+                (RUNNING, owner, time.time(), job_id, QUEUED),
+            )
+            return cursor.rowcount > 0
+
+    def heartbeat(self, job_id, owner):
+        """Show that owner is still running the campaign; False once it is no longer owner's to run."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET last_run_at = ? WHERE id = ? AND state = ? AND owner = ?",
+                (time.time(), job_id, RUNNING, owner),
+            )
+            return cursor.rowcount > 0
+
+    def release(self, job_id, owner, **fields):
+        """Set fields of a campaign owner is running and give up ownership; True if it was still owner's."""
+        fields["owner"] = None
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND state = ? AND owner = ?",
+                (*fields.values(), job_id, RUNNING, owner),
+            )
+            return cursor.rowcount > 0
+
+    def recover(self, stale_seconds=STALE_SECONDS):
+        """Requeue campaigns left running by a scheduler that died; they resume from their checkpoint.
+
+        A campaign counts as abandoned once its owner has not sent a heartbeat
+        for stale_seconds, so one that another process is still sending is left alone.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, resume = 1, owner = NULL"
+                " WHERE state = ? AND (last_run_at IS NULL OR last_run_at < ?)",
+                (QUEUED, RUNNING, time.time() - stale_seconds),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Scheduler:
+    """Runs queued campaigns through one WorkerPool, most urgent first.
+
+    Every session works on the current campaign. A watcher thread stops the
+    pool, after the recipients in flight, when a more urgent campaign becomes
+    eligible, the send window closes, the time slice is used up while another
+    campaign of the same priority waits, or the campaign is cancelled. The
+    checkpoint makes the interrupted campaign pick up where it left off.
+    """
+
+    def __init__(self, pool, journal, queue, log=None, info=None, output_dir=".", slice_minutes=SLICE_MINUTES,
+                 poll_interval=POLL_INTERVAL, on_outcome=None):
+        self.pool = pool
+        self.journal = journal
+        self.queue = queue
+        self.log = log or (lambda message: None)
+        self.info = info or (lambda message: None)
+        self.output_dir = output_dir
+        self.slice_minutes = slice_minutes
+        self.poll_interval = poll_interval
+        self.on_outcome = on_outcome
+        self.stop_requested = False
+        self.campaign = None
+        self.yield_reason = None
+        # Identifies this scheduler as the owner of the campaign it runs
+        self.owner = f"{os.getpid()}-{id(self):x}"
+
+    def eligible(self, now):
+        return [job for job in self.queue.jobs([QUEUED]) if job.is_open(now)]
+
+    def pick(self, now):
+        """The most urgent eligible job; among equal priorities, the one that waited longest."""
+        jobs = self.eligible(now)
+        if not jobs:
+            return None
+        return min(jobs, key=lambda job: (-job.priority, job.last_run_at or 0, job.id))
+
+    def should_yield(self, job, started):
+        """Return why the running job should give way, or None."""
+        current = self.queue.get(job.id)
+        if current is None or current.state == CANCELLED:
+            return "cancelled"
+        if current.owner != self.owner:
+            return "taken over by another scheduler"
+        now = datetime.now()
+        if not job.is_open(now):
+            return f"send window {job.window} closed"
+        waiting = [other for other in self.eligible(now) if other.id != job.id]
+        urgent = [other for other in waiting if other.priority > job.priority]
+        if urgent:
+            return f"pre-empted by #{urgent[0].id} (priority {urgent[0].priority})"
+        if self.slice_minutes and time.monotonic() - started >= self.slice_minutes * 60:
+            if any(other.priority == job.priority for other in waiting):
+                return f"{self.slice_minutes} minute turn used up"
+        return None
+
+    def run(self, until_empty=True):
+        """Run campaigns until the queue is empty, or until stop() with until_empty=False."""
+        while not self.stop_requested:
+            # Checked every time: a campaign's scheduler may die while this one runs
+            self.queue.recover()
+            if not self.pool.active_workers():
+                self.log("No browser session left; stopping the scheduler.")
+                break
+            job = self.pick(datetime.now())
+            if job is None:
+                # A campaign still running elsewhere may be abandoned and need taking over
+                if until_empty and not self.queue.jobs([QUEUED, RUNNING]):
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job):
+        settings = dict(job.settings)
+        template_text = settings.pop("template", None)
+        pipelined = settings.pop("pipelined", False)
+        pacing_mode = settings.pop("pacing", "adaptive")
+        delay = settings.pop("delay", FIXED_DELAY)
+        phone_column = settings.pop("phone_column", None)
+        country_code = settings.pop("country_code", None)
+        attachment_column = settings.pop("attachment_column", None)
+        try:
+            template = MessageTemplate(template_text) if template_text else None
+            campaign = Campaign(job.filepath, self.journal, log=self.log, info=self.info, template=template,
+                                phone_column=phone_column, country_code=country_code,
+                                attachment_column=attachment_column)
+            campaign.validate(resume=job.resume)
+        except (TemplateError, OSError, ValueError) as e:
+            self.log(f"Campaign #{job.id} cannot run: {str(e)}")
+            self.queue.update(job.id, state=FAILED, finished_at=time.time())
+            return
+
+        if not self.queue.claim(job.id, self.owner):
+            return
+        self.log(f"Running campaign {job.describe()}.")
+        self.campaign = campaign
+        self.yield_reason = None
+        finished = threading.Event()
+        watcher = threading.Thread(target=self._watch, args=(job, time.monotonic(), finished), daemon=True)
+        watcher.start()
+        # The campaign's rate is shared by every session
+        rate = job.rate / max(1, len(self.pool.active_workers()))
+        try:
+            campaign.run(self.pool, settings, resume=job.resume, pipelined=pipelined,
+                         pacing={"mode": pacing_mode, "rate": rate, "delay": delay}, on_outcome=self.on_outcome)
+        finally:
+            finished.set()
+            watcher.join()
+            self.campaign = None
+
+        # Decided from the run itself: a session that died or was closed before it
+        # started would otherwise keep the job from ever finishing
+        completed = (self.pool.feeding_done and self.pool.is_drained() and not self.pool.in_flight
+                     and not self.pool.stop_requested)
+        # Only a job this scheduler still owns changes state, so a cancel that came
+        # in after the watcher's last check is never overwritten
+        if completed:
+            updated = self.queue.release(job.id, self.owner, state=DONE, resume=1, finished_at=time.time())
+            message = f"Campaign #{job.id} finished."
+        else:
+            updated = self.queue.release(job.id, self.owner, state=QUEUED, resume=1)
+            message = (f"Campaign #{job.id} paused: {self.yield_reason or 'stopped'}; "
+                       "it will resume from its checkpoint.")
+        if not updated:
+            current = self.queue.get(job.id)
+            message = (f"Campaign #{job.id} cancelled." if current is None or current.state == CANCELLED
+                       else f"Campaign #{job.id} was taken over by another scheduler.")
+        self.log(message)
+        self.export_reports(job, campaign)
+
+    def export_reports(self, job, campaign):
+        try:
+            sent_count, unsent_count, unconfirmed_count = campaign.export_reports(
+                os.path.join(self.output_dir, f"sent_messages_{job.id}.xlsx"),
+                os.path.join(self.output_dir, f"unsent_messages_{job.id}.xlsx"),
+                os.path.join(self.output_dir, f"unconfirmed_messages_{job.id}.xlsx"),
+            )
+            self.log(f"Campaign #{job.id}: {sent_count} sent, {unsent_count} unsent so far.")
+            if unconfirmed_count:
+                self.log(f"Campaign #{job.id}: {unconfirmed_count} submitted messages were never confirmed.")
+        except Exception as e:
+            self.log(f"Error writing reports for campaign #{job.id}: {str(e)}")
+
+    def _watch(self, job, started, finished):
+        while not finished.wait(self.poll_interval):
+            self.queue.heartbeat(job.id, self.owner)
+            reason = self.should_yield(job, started)
+            if reason:
+                self.yield_reason = reason
+                self.log(f"Campaign #{job.id}: {reason}; stopping after the messages in flight.")
+                self.pool.stop()
+                return
+
+    def stop(self):
+        self.stop_requested = True
+        self.pool.stop()
+
+
+def main(argv=None):
+    # Imported here: the GUI imports this module and does not need the command line helpers
+    from cli import add_message_arguments, add_session_arguments, country_code, log_in, positive_float, sender_settings
+    from eventlog import EventLog
+    from journal import ResultJournal
+    from metrics import MetricsExporter
+    from pool import WorkerPool
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--journal", default="results_journal.db", help="Database holding the queue and results")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Queue a contact file")
+    add.add_argument("input", help="Contact file (.xlsx, .csv or .jsonl)")
+    add.add_argument("--priority", type=int, default=0, help="Higher runs first and pre-empts lower")
+    add.add_argument("--window", help="Daily send window, e.g. 09:00-21:00 (default: any time)")
+    add.add_argument("--rate", type=positive_float, default=DEFAULT_RATE, help="Messages per minute for the whole campaign")
+    add.add_argument("--resume", action="store_true", help="Continue from this file's last checkpoint")
+    add_message_arguments(add)
+
+    commands.add_parser("list", help="Show queued, running and finished campaigns")
+
+    cancel = commands.add_parser("cancel", help="Cancel a queued or running campaign")
+    cancel.add_argument("id", type=int)
+
+    run = commands.add_parser("run", help="Send queued campaigns")
+    add_session_arguments(run)
+    run.add_argument("--slice", type=float, default=SLICE_MINUTES, help="Minutes before yielding to an equal priority")
+    run.add_argument("--wait", action="store_true", help="Keep waiting for new campaigns when the queue is empty")
+    args = parser.parse_args(argv)
+
+    queue = CampaignQueue(args.journal)
+    try:
+        if args.command == "add":
+            settings = sender_settings(args)
+            settings.update(pipelined=args.pipelined, pacing=args.pacing, delay=args.delay, phone_column=args.phone_column,
+                            country_code=country_code(args), attachment_column=args.attachment_column)
+            if args.template:
+                with open(args.template, encoding="utf-8") as f:
+                    settings["template"] = f.read()
+            try:
+                job_id = queue.add(args.input, args.priority, args.window, args.rate, settings, args.resume)
+            except ValueError as e:
+                print(str(e))
+                return 2
+            print(f"Queued campaign #{job_id}.")
+            return 0
+        if args.command == "list":
+            for job in queue.jobs():
+                print(job.describe())
+            return 0
+        if args.command == "cancel":
+            if not queue.cancel(args.id):
+                print(f"No queued or running campaign #{args.id}.")
+                return 1
+            print(f"Cancelled campaign #{args.id}.")
+            return 0
+    finally:
+        if args.command != "run":
+            queue.close()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output = lambda name: os.path.join(args.output_dir, name)
+    events = EventLog(output("log.txt"), gui=False)
+
+    def log(message):
+        print(message, flush=True)
+        events.emit(message)
+
+    journal = ResultJournal(args.journal)
+    pool = WorkerPool(args.webdriver, args.sessions, journal, log=log, headless=args.headless,
+                      profile_root=args.profile_dir)
+    scheduler = Scheduler(pool, journal, queue, log=log, output_dir=args.output_dir, slice_minutes=args.slice)
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    try:
+        if not log_in(pool, args, log, output):
+            return 2
+        exporter = MetricsExporter(pool.metrics, path=args.metrics_file, port=args.metrics_port).start()
+        try:
+            scheduler.run(until_empty=not args.wait)
+        except KeyboardInterrupt:
+            scheduler.stop()
+            pool.wait()
+            log("Interrupted; queued campaigns continue on the next run.")
+        finally:
+            exporter.stop()
+        return 0
+    finally:
+        pool.close()
+        queue.close()
+        journal.close()
+        events.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
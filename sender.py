@@ -0,0 +1,393 @@
+import functools
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+from selenium import webdriver
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from journal import SUBMITTED
+from locators import LocatorRegistry
+from metrics import Metrics
+
+
+WHATSAPP_URL = "https://web.whatsapp.com/"
+
+# Opens a chat inside the running WhatsApp Web app: the app intercepts clicks on
+# its own "send" links and routes them client-side instead of reloading the page.
+OPEN_CHAT_SCRIPT = """
+var link = document.createElement('a');
+link.href = arguments[1] + 'send?phone=' + encodeURIComponent(arguments[0]);
+link.style.display = 'none';
+document.body.appendChild(link);
+link.click();
+link.remove();
+"""
+
+STATUS_ICONS = {
+    "msg-check": "Sent",
+    "msg-dblcheck": "Delivered",
+    "msg-dblcheck-ack": "Read",
+}
+
+STATUS_SELECTOR = ", ".join(f"span[data-icon='{icon}']" for icon in ["msg-time", *STATUS_ICONS])
+
+# Newest status icon in the chat, pending or terminal, in a single lookup
+STATUS_XPATH = "(//span[" + " or ".join(f"@data-icon='{icon}'" for icon in ["msg-time", *STATUS_ICONS]) + "])[last()]"
+
+MARK_STATUS_SCRIPT = """
+document.querySelectorAll(arguments[0]).forEach(function (icon) {
+    icon.setAttribute('data-sender-seen', '1');
+});
+"""
+
+# Resolves with the newest message's terminal data-icon, or null at the deadline.
+# Icons tagged by MARK_STATUS_SCRIPT belong to messages sent before this one.
+WAIT_STATUS_SCRIPT = """
+var selector = arguments[0], terminal = arguments[1], deadline = arguments[2];
+var done = arguments[arguments.length - 1];
+var finished = false, observer, timer;
+function finish(result) {
+    if (finished) { return; }
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    done(result);
+}
+function check() {
+    var icons = document.querySelectorAll(selector);
+    var newest = icons[icons.length - 1];
+    if (newest && !newest.hasAttribute('data-sender-seen') && terminal.indexOf(newest.getAttribute('data-icon')) !== -1) {
+        finish(newest.getAttribute('data-icon'));
+    }
+}
+observer = new MutationObserver(check);
+observer.observe(document.body, {childList: true, subtree: true, attributes: true, attributeFilter: ['data-icon']});
+timer = setTimeout(function () { finish(null); }, deadline);
+check();
+"""
+
+# Default overall deadline for a message to reach a terminal status
+STATUS_TIMEOUT = 30
+
+# How long in-app navigation gets to show the new chat before falling back to a reload
+FAST_NAVIGATION_TIMEOUT = 5
+
+# Control and Latin-1 range characters stripped from message text before pasting
+CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\xff]')
+
+# Puts text into a compose or caption box without the system clipboard: a paste
+# event carrying its own DataTransfer is handled by the editor like a real paste,
+# and insertText covers editors that ignore synthetic paste events.
+INSERT_TEXT_SCRIPT = """
+var box = arguments[0], text = arguments[1];
+box.focus();
+var data = new DataTransfer();
+data.setData('text/plain', text);
+var event = new ClipboardEvent('paste', {clipboardData: data, bubbles: true, cancelable: true});
+box.dispatchEvent(event);
+if (!event.defaultPrevented) {
+    document.execCommand('insertText', false, text);
+}
+"""
+
+# The attach button opens the menu that holds the hidden file inputs
+ATTACH_BUTTON_SELECTOR = ", ".join(
+    f"[data-icon='{icon}']" for icon in ["plus", "plus-rounded", "attach-menu-plus", "clip"]
+)
+FILE_INPUT_SELECTOR = "input[type='file']"
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp")
+
+# Directory holding this run's downscaled attachments; removed by clear_prepared_attachments()
+_prepared_dir = None
+_prepared_lock = threading.Lock()
+
+
+def launch_driver(webdriver_path, profile_dir, headless=False):
+    """Start Chrome on profile_dir; without webdriver_path, Selenium Manager locates chromedriver."""
+    chrome_options = Options()
+    chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1280,900")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+    service = webdriver.chrome.service.Service(webdriver_path) if webdriver_path else None
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    if headless:
+        # WhatsApp Web refuses browsers that identify as HeadlessChrome
+        user_agent = driver.execute_script("return navigator.userAgent").replace("HeadlessChrome", "Chrome")
+        driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": user_agent})
+    return driver
+
+
+def is_driver_alive(driver):
+    try:
+        driver.window_handles
+        return True
+    except WebDriverException:
+        return False
+
+
+def is_image(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+@functools.lru_cache(maxsize=256)
+def prepared_attachment(path, mtime, max_dimension=None):
+    """Return the file to upload for path, preparing it once per (path, mtime, max_dimension).
+
+    Images are downscaled so the longest side is at most max_dimension pixels
+    to cut upload time; everything else, and images already small enough, is
+    uploaded as is. mtime is part of the key so an edited file is prepared again.
+    """
+    if not max_dimension or not is_image(path):
+        return path
+    from PIL import Image
+
+    with Image.open(path) as image:
+        if max(image.size) <= max_dimension:
+            return path
+        image_format = image.format
+        image.thumbnail((max_dimension, max_dimension))
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(path)[1], dir=prepared_dir(), delete=False) as f:
+            image.save(f, image_format)
+    return f.name
+
+
+def prepare_attachments(paths, max_dimension=None):
+    return [prepared_attachment(os.path.abspath(path), os.path.getmtime(path), max_dimension) for path in paths]
+
+
+def prepared_dir():
+    global _prepared_dir
+    with _prepared_lock:
+        if _prepared_dir is None:
+            _prepared_dir = tempfile.mkdtemp(prefix="whatsapp_attachments_")
+        return _prepared_dir
+
+
+def clear_prepared_attachments():
+    """Forget every prepared attachment and delete the downscaled copies; called at the end of each run."""
+    global _prepared_dir
+    with _prepared_lock:
+        prepared_attachment.cache_clear()
+        if _prepared_dir is not None:
+            shutil.rmtree(_prepared_dir, ignore_errors=True)
+            _prepared_dir = None
+
+
+class WhatsAppSender:
+    """Sends messages through one logged-in WhatsApp Web browser session.
+
+    Settings are plain values captured when the campaign starts, so a sender
+    never touches Tk variables from its worker thread.
+    """
+
+    def __init__(self, driver, language="auto", send_mode="message", photo_path="", navigation="fast",
+                 status_timeout=STATUS_TIMEOUT, photo_max_dimension=None, base_url=WHATSAPP_URL,
+                 metrics=None, log=None, info=None):
+        self.driver = driver
+        self.wait = WebDriverWait(driver, 10)
+        self.language = language
+        self.send_mode = send_mode
+        self.photo_path = photo_path
+        self.photo_max_dimension = photo_max_dimension
+        self.navigation = navigation
+        # Overridden to point the sender at a local mock of WhatsApp Web
+        self.base_url = base_url
+        self.status_timeout = status_timeout
+        # Leave the observer room to hit its own deadline before WebDriver gives up
+        driver.set_script_timeout(status_timeout + 5)
+        self.log = log or (lambda message: None)
+        self.info = info or (lambda message: None)
+        self.locators = LocatorRegistry(driver, language, log=self.log)
+        self.metrics = metrics or Metrics()
+
+    def open_chat(self, phone_number):
+        """Open the chat for phone_number and return its message box, or None if it never appears.
+
+        In "fast" mode the chat is opened by in-app routing when WhatsApp Web is
+        already loaded, falling back to a full page load if that does not work.
+        """
+        if self.navigation == "fast" and self.driver.current_url.startswith(self.base_url):
+            message_box = self.open_chat_in_app(phone_number)
+            if message_box:
+                return message_box
+            self.log(f"In-app navigation to {phone_number} failed; reloading the page.")
+
+        with self.metrics.timer("navigation"):
+            self.driver.get(f"{self.base_url}send?phone={phone_number}")
+
+        retries = 0
+        while retries < 3:
+            try:
+                return self.find_message_box(self.wait)
+            except TimeoutException:
+                retries += 1
+                self.info(f"Retry {retries} for {phone_number}")
+                self.log(f"Retry {retries}: Failed to locate message box for {phone_number}")
+        return None
+
+    def find_message_box(self, wait):
+        try:
+            with self.metrics.timer("compose_wait"):
+                message_box = wait.until(EC.presence_of_element_located(self.locators.locator("message_box")))
+        except TimeoutException:
+            # A cached locator may have gone stale; the next attempt tries every candidate again
+            self.locators.forget("message_box")
+            raise
+        self.locators.found("message_box", message_box)
+        return message_box
+
+    def open_chat_in_app(self, phone_number):
+        try:
+            previous_box = self.driver.find_element(*self.locators.locator("message_box"))
+        except NoSuchElementException:
+            previous_box = None
+
+        fast_wait = WebDriverWait(self.driver, FAST_NAVIGATION_TIMEOUT)
+        try:
+            with self.metrics.timer("navigation"):
+                self.driver.execute_script(OPEN_CHAT_SCRIPT, phone_number, self.base_url)
+                # The previous chat's box must go away first, or we would type into the old chat
+                if previous_box is not None:
+                    fast_wait.until(EC.staleness_of(previous_box))
+            return self.find_message_box(fast_wait)
+        except TimeoutException:
+            return None
+
+    def send(self, phone_number, message, confirm=True, attachments=None):
+        """Open the chat for phone_number, send the message, photo or attachments and return its status.
+
+        attachments is a list of file paths sent with the message as caption; in
+        photo mode the chosen photo is sent on its own. With confirm=False the
+        method returns "Submitted" as soon as the message is handed to WhatsApp
+        and leaves delivery checks to a DeliveryVerifier.
+        """
+        if self.send_mode != "message":
+            if not self.photo_path:
+                self.info(f"No photo chosen for {phone_number}")
+                self.log(f"No photo chosen for {phone_number}")
+                return "Not Sent"
+            attachments, message = [self.photo_path], ""
+        # Resolved before opening the chat so a missing file costs no browser work
+        files = prepare_attachments(attachments, self.photo_max_dimension) if attachments else None
+
+        self.log(f"Attempting to send to {phone_number}...")
+        message_box = self.open_chat(phone_number)
+
+        if not message_box:
+            self.log(f"Failed to find message box for {phone_number} after retries.")
+            return "Not Sent"
+
+        with self.metrics.timer("paste_send"):
+            self.mark_existing_status()
+            if files:
+                status = self.upload_and_send(phone_number, message, files)
+            else:
+                self.insert_text(message_box, message)
+                message_box.send_keys(Keys.ENTER)
+                status = None
+        if status:
+            return status
+
+        if not confirm:
+            return SUBMITTED
+        with self.metrics.timer("status_wait"):
+            return self.check_message_status()
+
+    def insert_text(self, box, text):
+        """Type text into box through the page instead of the system clipboard, so sessions never collide."""
+        cleaned_text = CONTROL_CHARS.sub('', text)
+        if cleaned_text:
+            self.driver.execute_script(INSERT_TEXT_SCRIPT, box, cleaned_text)
+
+    def upload_and_send(self, phone_number, caption, files):
+        """Attach files through the chat's hidden file input and send them; returns "Not Sent" on failure."""
+        file_input = self.find_file_input(all(is_image(path) for path in files))
+        if file_input is None:
+            self.log(f"Failed to find the attachment input for {phone_number}.")
+            return "Not Sent"
+        file_input.send_keys("\n".join(files))
+        try:
+            caption_box = self.wait.until(EC.presence_of_element_located(self.locators.locator("caption")))
+        except TimeoutException:
+            self.locators.forget("caption")
+            self.log(f"Failed to find caption box for {phone_number}.")
+            return "Not Sent"
+        self.locators.found("caption", caption_box)
+        self.insert_text(caption_box, caption)
+        caption_box.send_keys(Keys.ENTER)
+        return None
+
+    def find_file_input(self, images_only):
+        """Return the media input for images and the document input otherwise, opening the attach menu if needed."""
+        inputs = self.driver.find_elements(By.CSS_SELECTOR, FILE_INPUT_SELECTOR)
+        if not inputs:
+            try:
+                self.driver.find_element(By.CSS_SELECTOR, ATTACH_BUTTON_SELECTOR).click()
+                inputs = self.wait.until(lambda driver: driver.find_elements(By.CSS_SELECTOR, FILE_INPUT_SELECTOR))
+            except (NoSuchElementException, TimeoutException):
+                return None
+        for file_input in inputs:
+            accepts_images = "image" in (file_input.get_attribute("accept") or "")
+            if accepts_images == images_only:
+                return file_input
+        return inputs[0]
+
+    def mark_existing_status(self):
+        """Tag the status icons already in the chat so the detector only reacts to the new message."""
+        try:
+            self.driver.execute_script(MARK_STATUS_SCRIPT, STATUS_SELECTOR)
+        except WebDriverException:
+            pass
+
+    def check_message_status(self):
+        """Wait for the newest message to reach a terminal status icon, up to status_timeout seconds.
+
+        A MutationObserver injected into the page resolves as soon as the icon
+        changes; if script injection fails, one combined XPath is polled instead.
+        """
+        try:
+            icon = self.driver.execute_async_script(
+                WAIT_STATUS_SCRIPT, STATUS_SELECTOR, list(STATUS_ICONS), int(self.status_timeout * 1000)
+            )
+        except TimeoutException:
+            icon = None
+        except WebDriverException as e:
+            self.log(f"Status observer unavailable ({str(e).splitlines()[0]}); polling instead.")
+            icon = self.poll_status()
+
+        if icon is None:
+            self.log(f"No final status within {self.status_timeout}s. Returning 'Not Sent'.")
+            return "Not Sent"
+        state = STATUS_ICONS[icon]
+        self.log(f"Message status updated to: {state}")
+        return state
+
+    def read_status(self):
+        """Return the newest message's current data-icon in the open chat without waiting."""
+        icons = self.driver.find_elements(By.XPATH, STATUS_XPATH)
+        return icons[0].get_attribute("data-icon") if icons else None
+
+    def poll_status(self):
+        def newest_terminal_icon(driver):
+            icons = driver.find_elements(By.XPATH, STATUS_XPATH)
+            if not icons or icons[0].get_attribute("data-sender-seen"):
+                return False
+            icon = icons[0].get_attribute("data-icon")
+            return icon if icon in STATUS_ICONS else False
+
+        try:
+            return WebDriverWait(self.driver, self.status_timeout, poll_frequency=0.2).until(newest_terminal_icon)
+        except TimeoutException:
+            return None
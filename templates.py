@@ -0,0 +1,111 @@
+import re
+import string
+from datetime import datetime
+
+
+# A standard format spec ([[fill]align][sign][z][#][0][width][grouping][.precision][type]);
+# anything else, such as %d/%m/%Y, is a date format
+STANDARD_SPEC = re.compile(r"(.?[<>=^])?[+\- ]?z?#?0?(\d+)?([,_])?(\.\d+)?([bcdeEfFgGnosxX%])?")
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def coerce(value, format_spec):
+    """Convert a cell to the type its format spec needs.
+
+    CSV and JSONL cells are always text and Excel stores whole numbers as
+    floats, so neither would satisfy a date or integer spec as is.
+    """
+    spec = STANDARD_SPEC.fullmatch(format_spec)
+    if spec is None:
+        return datetime.fromisoformat(value.strip()) if isinstance(value, str) else value
+    grouping, kind = spec.group(3), spec.group(5)
+    if kind and kind in "bcdoxXn":
+        number = float(value.strip()) if isinstance(value, str) else value
+        if isinstance(number, float):
+            if not number.is_integer():
+                raise ValueError(f"{value!r} is not a whole number")
+            return int(number)
+        return number
+    if isinstance(value, str) and ((kind and kind in "eEfFgG%") or (grouping and not kind)):
+        return float(value.strip())
+    return value
+
+
+def format_value(value, format_spec=""):
+    # Empty cells render empty whatever the spec; validate() reports them separately
+    if value is None or value == "":
+        return ""
+    if format_spec:
+        return format(coerce(value, format_spec), format_spec)
+    # Excel hands whole numbers back as floats; "5.0 items" is never what was meant
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class MessageTemplate:
+    """A message with {column} placeholders filled from each contact row.
+
+    The template is parsed once. compile() then resolves every placeholder to a
+    column index for a given header, so rendering a row is a single join over
+    pre-split literals with no parsing or dict lookups. Format specs such as
+    {due_date:%d/%m/%Y} or {amount:,.2f} are applied with format(); text cells
+    are read as ISO dates or numbers first, and a value the spec cannot format
+    raises TemplateError naming the placeholder.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.parts = []
+        try:
+            for literal, field, format_spec, conversion in string.Formatter().parse(text):
+                if field is not None and (not field or conversion):
+                    raise TemplateError(f"Unsupported placeholder {{{field}{'!' + conversion if conversion else ''}}}")
+                self.parts.append((literal, field, format_spec or ""))
+        except ValueError as e:
+            raise TemplateError(f"Invalid template: {str(e)}") from e
+
+    @property
+    def fields(self):
+        return [field for _, field, _ in self.parts if field is not None]
+
+    def missing_fields(self, header):
+        columns = {str(column) for column in header if column is not None}
+        return sorted({field for field in self.fields if field not in columns})
+
+    def compile(self, header):
+        """Return a function rendering a row of values laid out under header."""
+        missing = self.missing_fields(header)
+        if missing:
+            raise TemplateError(f"Template fields not found in the contact file: {', '.join(missing)}")
+        index = {str(column): position for position, column in enumerate(header)}
+        parts = [(literal, field, index[field] if field is not None else None, format_spec)
+                 for literal, field, format_spec in self.parts]
+
+        def render(values):
+            pieces = []
+            for literal, field, position, format_spec in parts:
+                pieces.append(literal)
+                if position is not None:
+                    value = values[position] if position < len(values) else None
+                    try:
+                        pieces.append(format_value(value, format_spec))
+                    except (ValueError, TypeError) as e:
+                        raise TemplateError(f"{{{field}:{format_spec}}} cannot format {value!r}: {str(e)}") from e
+            return "".join(pieces)
+
+        return render
+
+    def blank_fields(self, header, values):
+        """Return the placeholders that would render empty for this row."""
+        index = {str(column): position for position, column in enumerate(header)}
+        return [field for field in dict.fromkeys(self.fields)
+                if index[field] >= len(values) or values[index[field]] in (None, "")]
+
+
+def load_template(path):
+    with open(path, encoding="utf-8") as f:
+        return MessageTemplate(f.read())
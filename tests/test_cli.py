@@ -0,0 +1,24 @@
+import contextlib
+import io
+import unittest
+
+from cli import parse_args
+
+
+class ParseArgsTest(unittest.TestCase):
+    def assertRejected(self, *argv):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["--input", "contacts.csv", *argv])
+
+    def test_rate_must_be_positive(self):
+        self.assertEqual(parse_args(["--input", "contacts.csv", "--rate", "2.5"]).rate, 2.5)
+        self.assertRejected("--rate", "0")
+        self.assertRejected("--rate", "-3")
+
+    def test_delay_must_not_be_negative(self):
+        self.assertEqual(parse_args(["--input", "contacts.csv", "--delay", "0"]).delay, 0)
+        self.assertRejected("--delay", "-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
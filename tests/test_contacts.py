@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import openpyxl
+
+import contacts
+from contacts import ContactSource
+from engine import Campaign
+from journal import CheckpointMismatch, ResultJournal, source_fingerprint
+
+
+class ContactSourceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def write_csv(self, count):
+        path = self.path("contacts.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write("Phone,Message\n" + "".join(f"96651234{index:04d},Hello {index}\n" for index in range(count)))
+        return path
+
+    def write_xlsx(self, count, write_only=False):
+        path = self.path("contacts.xlsx")
+        workbook = openpyxl.Workbook(write_only=write_only)
+        sheet = workbook.create_sheet() if write_only else workbook.active
+        sheet.append(["Phone", "Message"])
+        for index in range(count):
+            sheet.append([966512340000 + index, f"Hello {index}"])
+        workbook.save(path)
+        return path
+
+    def resume_after(self, path, stop_row):
+        """Iterate up to stop_row, then return what a resume from that point yields."""
+        source = ContactSource(path)
+        for row_id, _ in source:
+            if row_id == stop_row:
+                break
+        return list(ContactSource(path, start_row=stop_row + 1, start_offset=source.offset))
+
+    def test_csv_resume_offset(self):
+        path = self.write_csv(10)
+        rows = list(ContactSource(path))
+        self.assertEqual(rows[0], (2, ("966512340000", "Hello 0")))
+        self.assertEqual(self.resume_after(path, 5), rows[4:])
+
+    def test_jsonl_resume_keeps_the_header(self):
+        path = self.path("contacts.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for index in range(6):
+                f.write(json.dumps({"Phone": f"96651234{index:04d}", "Message": f"Hello {index}"}) + "\n")
+        rows = list(ContactSource(path))
+        self.assertEqual(rows[-1], (7, ("966512340005", "Hello 5")))
+        self.assertEqual(self.resume_after(path, 3), rows[2:])
+
+    def test_xlsx_resume_by_row(self):
+        path = self.write_xlsx(6)
+        rows = list(ContactSource(path))
+        self.assertEqual(list(ContactSource(path, start_row=5)), rows[3:])
+
+    def test_estimate_total(self):
+        self.assertEqual(ContactSource(self.write_csv(10)).estimate_total(), 10)
+        self.assertEqual(ContactSource(self.write_xlsx(10)).estimate_total(), 10)
+
+    def test_estimate_total_without_xlsx_dimension(self):
+        # Write-only workbooks carry no <dimension>; the estimate comes from the sheet XML
+        estimate = ContactSource(self.write_xlsx(5000, write_only=True)).estimate_total()
+        self.assertIsNotNone(estimate)
+        self.assertAlmostEqual(estimate, 5000, delta=500)
+
+    def test_workbook_opened_once_per_run(self):
+        path = self.write_xlsx(20)
+        load_workbook = openpyxl.load_workbook
+        with mock.patch.object(contacts.openpyxl, "load_workbook", side_effect=load_workbook) as load:
+            source = ContactSource(path)
+            self.assertEqual(source.read_header(), ("Phone", "Message"))
+            self.assertEqual(source.estimate_total(), 20)
+            self.assertEqual(len(list(source)), 20)
+        self.assertEqual(load.call_count, 1)
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "contacts.csv")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("Phone,Message\n966512345671,a\n966512345672,b\n")
+        self.journal = ResultJournal(os.path.join(self.directory, "journal.db"))
+        self.campaign = Campaign(self.path, self.journal)
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.directory)
+
+    def test_resume_from_unchanged_file(self):
+        self.journal.checkpoint(self.campaign.id, 2, 27, fingerprint=source_fingerprint(self.path))
+        self.assertEqual(self.campaign.load_checkpoint()[:2], (2, 27))
+
+    def test_resume_refused_after_edit(self):
+        self.journal.checkpoint(self.campaign.id, 2, 27, fingerprint=source_fingerprint(self.path))
+        time.sleep(0.01)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("966512345673,c\n")
+        with self.assertRaises(CheckpointMismatch):
+            self.campaign.validate(resume=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from eventlog import EventLog
+
+
+class EventLogTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, "log.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def read(self, path=None):
+        with open(path or self.path, encoding="utf-8") as f:
+            return [line.split(": ", 1)[1] for line in f.read().splitlines()]
+
+    def test_events_arriving_together_are_written_in_one_batch(self):
+        with mock.patch.object(EventLog, "_write", autospec=True, side_effect=EventLog._write) as write:
+            log = EventLog(self.path, flush_interval=5)
+            for index in range(3):
+                log.emit(f"message {index}")
+            log.close()
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(self.read(), ["message 0", "message 1", "message 2"])
+
+    def test_only_log_events_reach_the_file(self):
+        log = EventLog(self.path, flush_interval=0)
+        log.emit("started")
+        log.emit(50, kind="progress")
+        log.close()
+        self.assertEqual(self.read(), ["started"])
+        self.assertEqual(log.drain(), [("log", "started"), ("progress", 50)])
+        self.assertEqual(log.drain(), [])
+
+    def test_drain_limit(self):
+        log = EventLog(self.path, flush_interval=0)
+        for index in range(5):
+            log.emit(index, kind="progress")
+        log.close()
+        self.assertEqual(len(log.drain(limit=3)), 3)
+        self.assertEqual(len(log.drain()), 2)
+
+    def test_headless_log_keeps_no_gui_queue(self):
+        log = EventLog(self.path, flush_interval=0, gui=False)
+        log.emit("started")
+        log.close()
+        self.assertEqual(log.drain(), [])
+        self.assertEqual(self.read(), ["started"])
+
+    def test_rotation_keeps_backup_count_files(self):
+        log = EventLog(self.path, max_bytes=1, backup_count=2, flush_interval=0)
+        for index in range(4):
+            log.emit(f"message {index}")
+        log.close()
+        self.assertEqual(self.read(), ["message 3"])
+        self.assertEqual(self.read(self.path + ".1"), ["message 2"])
+        self.assertEqual(self.read(self.path + ".2"), ["message 1"])
+        self.assertFalse(os.path.exists(self.path + ".3"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import openpyxl
+
+from contacts import ContactSource
+from journal import FAILED, PENDING, SENT, SKIPPED, SUBMITTED_STATE, RecipientStatus, ResultJournal
+
+
+def read_sheet(path):
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return [tuple(row) for row in workbook.active.iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+
+class JournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.journal = ResultJournal(self.path("journal.db"))
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+
+class RecipientStatusTest(unittest.TestCase):
+    def test_counts_follow_state_changes(self):
+        recipients = RecipientStatus()
+        recipients.mark(5, FAILED)
+        recipients.mark(2, SENT)
+        recipients.mark(3, SKIPPED)
+        self.assertEqual((recipients.sent, recipients.failed, recipients.skipped), (1, 1, 1))
+        recipients.mark(5, SENT)
+        self.assertEqual((recipients.sent, recipients.failed), (2, 0))
+
+    def test_lookups(self):
+        recipients = RecipientStatus()
+        recipients.mark(2, SENT)
+        recipients.mark(3, SKIPPED)
+        recipients.mark(4, FAILED)
+        self.assertEqual(recipients.get(100), PENDING)
+        self.assertTrue(recipients.is_sent(2))
+        self.assertTrue(recipients.is_pending(5))
+        recipients.mark(6, SUBMITTED_STATE)
+        self.assertEqual([recipients.needs_sending(row_id) for row_id in (2, 3, 4, 5, 6)],
+                         [False, False, True, True, False])
+        self.assertTrue(recipients.is_unconfirmed(6))
+
+
+class ResultJournalTest(JournalTestCase):
+    def test_outcomes_in_row_order_with_the_latest_status(self):
+        self.journal.record("a", 3, "966512345673", "c", "Sent")
+        self.journal.record("a", 2, "966512345672", "b", "Not Sent")
+        self.journal.record("a", 3, "966512345673", "c", "Delivered")
+        self.journal.record("b", 2, "966512345679", "x", "Sent")
+        self.assertEqual(list(self.journal.outcomes("a")), [
+            (2, "966512345672", "b", "Not Sent"),
+            (3, "966512345673", "c", "Delivered"),
+        ])
+
+    def test_clear_only_touches_one_campaign(self):
+        self.journal.record("a", 2, "966512345672", "b", "Sent")
+        self.journal.record("b", 2, "966512345679", "x", "Sent")
+        self.journal.checkpoint("a", 2)
+        self.journal.clear("a")
+        self.assertEqual(list(self.journal.outcomes("a")), [])
+        self.assertIsNone(self.journal.load_checkpoint("a"))
+        self.assertEqual(len(list(self.journal.outcomes("b"))), 1)
+
+    def test_export_sent(self):
+        for row_id, status in enumerate(["Sent", "Delivered", "Read", "Not Sent", "Submitted"], start=2):
+            self.journal.record("a", row_id, f"96651234567{row_id}", f"m{row_id}", status)
+        self.assertEqual(self.journal.export_sent("a", self.path("sent.xlsx")), 3)
+        self.assertEqual(read_sheet(self.path("sent.xlsx")), [
+            ("Phone Number", "Message", "Status"),
+            ("966512345672", "m2", "Sent"),
+            ("966512345673", "m3", "Delivered"),
+            ("966512345674", "m4", "Read"),
+        ])
+
+    def test_load_status(self):
+        for row_id, status in [(2, "Delivered"), (3, "Not Sent"), (4, "Duplicate"), (5, "Submitted")]:
+            self.journal.record("a", row_id, "", "", status)
+        recipients = self.journal.load_status("a")
+        self.assertEqual([recipients.get(row_id) for row_id in range(2, 7)],
+                         [SENT, FAILED, SKIPPED, SUBMITTED_STATE, PENDING])
+
+    def test_export_unsent_lists_failed_and_pending_rows(self):
+        path = self.path("contacts.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Phone,Message\n966512345672,a\n966512345673,b\n966512345674,c\n966512345675,d\n")
+        recipients = RecipientStatus()
+        recipients.mark(2, SENT)
+        recipients.mark(3, FAILED)
+        recipients.mark(4, SKIPPED)
+        self.assertEqual(self.journal.export_unsent(ContactSource(path), recipients, self.path("unsent.xlsx")), 2)
+        self.assertEqual(read_sheet(self.path("unsent.xlsx")), [
+            ("Phone", "Message"), ("966512345673", "b"), ("966512345675", "d"),
+        ])
+
+    def test_submitted_rows_are_unconfirmed_not_unsent(self):
+        path = self.path("contacts.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Phone,Message\n966512345672,a\n966512345673,b\n")
+        recipients = RecipientStatus()
+        recipients.mark(2, SUBMITTED_STATE)
+        self.assertEqual(recipients.submitted, 1)
+        self.assertEqual(self.journal.export_unsent(ContactSource(path), recipients, self.path("unsent.xlsx")), 1)
+        self.assertEqual(read_sheet(self.path("unsent.xlsx"))[1:], [("966512345673", "b")])
+        unconfirmed = self.path("unconfirmed.xlsx")
+        self.assertEqual(self.journal.export_unconfirmed(ContactSource(path), recipients, unconfirmed), 1)
+        self.assertEqual(read_sheet(unconfirmed)[1:], [("966512345672", "a")])
+
+        # Once verified, the stale unconfirmed report is removed
+        recipients.mark(2, SENT)
+        self.assertEqual(self.journal.export_unconfirmed(ContactSource(path), recipients, unconfirmed), 0)
+        self.assertFalse(os.path.exists(unconfirmed))
+
+
+if __name__ == "__main__":
+    unittest.main()
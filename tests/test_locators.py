@@ -0,0 +1,70 @@
+import unittest
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+from locators import LOCALE_INDEPENDENT_XPATHS, LocatorRegistry
+
+
+class FakeDriver:
+    """Reports a page language and serves elements per XPath."""
+
+    def __init__(self, lang="en-US", elements=None):
+        self.lang = lang
+        self.elements = elements or {}
+        self.scripts = 0
+
+    def execute_script(self, script):
+        self.scripts += 1
+        if isinstance(self.lang, Exception):
+            raise self.lang
+        return self.lang
+
+    def find_elements(self, by, xpath):
+        return self.elements.get(xpath, [])
+
+
+class LocatorRegistryTest(unittest.TestCase):
+    def test_locale_is_detected_once(self):
+        driver = FakeDriver("ar-SA")
+        registry = LocatorRegistry(driver)
+        self.assertEqual(registry.detect_locale(), "ar")
+        self.assertEqual(registry.detect_locale(), "ar")
+        self.assertEqual(driver.scripts, 1)
+
+    def test_explicit_language_skips_detection(self):
+        driver = FakeDriver("ar")
+        self.assertEqual(LocatorRegistry(driver, language="en").detect_locale(), "en")
+        self.assertEqual(driver.scripts, 0)
+
+    def test_unreadable_language(self):
+        self.assertEqual(LocatorRegistry(FakeDriver(WebDriverException("gone"))).detect_locale(), "")
+
+    def test_detected_language_is_tried_first_after_structural_xpaths(self):
+        candidates = LocatorRegistry(FakeDriver("ar")).candidates("message_box")
+        self.assertEqual(candidates, LOCALE_INDEPENDENT_XPATHS["message_box"] + [
+            "//div[@aria-placeholder='اكتب رسالة']",
+            "//div[@aria-placeholder='Type a message']",
+        ])
+
+    def test_unresolved_locator_is_the_union_of_candidates(self):
+        registry = LocatorRegistry(FakeDriver("en"))
+        self.assertEqual(registry.locator("caption"), (By.XPATH, " | ".join(registry.candidates("caption"))))
+
+    def test_found_caches_the_matching_candidate_until_forgotten(self):
+        box = object()
+        xpath = "//div[@aria-placeholder='Type a message']"
+        registry = LocatorRegistry(FakeDriver("en", {xpath: [box]}))
+        registry.found("message_box", box)
+        self.assertEqual(registry.locator("message_box"), (By.XPATH, xpath))
+        registry.forget("message_box")
+        self.assertEqual(registry.locator("message_box")[1], " | ".join(registry.candidates("message_box")))
+
+    def test_found_without_a_match_resolves_nothing(self):
+        registry = LocatorRegistry(FakeDriver("en"))
+        registry.found("message_box", object())
+        self.assertEqual(registry.resolved, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+from metrics import BUCKETS, Histogram, Metrics, MetricsExporter
+
+
+class HistogramTest(unittest.TestCase):
+    def test_buckets_and_percentiles(self):
+        histogram = Histogram()
+        for seconds in (0.01, 0.3, 0.3, 7, 100):
+            histogram.observe(seconds)
+        self.assertEqual(histogram.counts[0], 1)
+        self.assertEqual(histogram.counts[BUCKETS.index(0.5)], 2)
+        self.assertEqual(histogram.counts[BUCKETS.index(10)], 1)
+        self.assertEqual(histogram.counts[-1], 1)
+        self.assertEqual(histogram.summary(), {"count": 5, "sum": 107.61, "p50": 0.3, "p95": 100, "p99": 100})
+
+    def test_empty(self):
+        self.assertIsNone(Histogram().percentile(0.5))
+
+
+class MetricsTest(unittest.TestCase):
+    def test_eta_and_rate_follow_completions(self):
+        with mock.patch("metrics.time.monotonic", return_value=0):
+            metrics = Metrics()
+        self.assertIsNone(metrics.eta(10))
+        self.assertIsNone(metrics.rate)
+        for now in (2, 4, 6):
+            with mock.patch("metrics.time.monotonic", return_value=now):
+                metrics.record_outcome("Sent")
+        self.assertEqual(metrics.eta(10), 20)
+        self.assertEqual(metrics.rate, 30)
+
+    def test_later_updates_count_without_moving_the_eta(self):
+        with mock.patch("metrics.time.monotonic", return_value=0):
+            metrics = Metrics()
+        with mock.patch("metrics.time.monotonic", return_value=2):
+            metrics.record_outcome("Submitted")
+        with mock.patch("metrics.time.monotonic", return_value=60):
+            metrics.record_outcome("Delivered", completed=False)
+        self.assertEqual(metrics.eta(1), 2)
+        self.assertEqual(metrics.outcomes, {"Submitted": 1, "Delivered": 1})
+
+    def test_exports(self):
+        metrics = Metrics()
+        metrics.observe("navigation", 0.2)
+        metrics.record_outcome("Sent")
+        self.assertEqual(metrics.describe(), "Timings: navigation p50 0.20s")
+        data = json.loads(metrics.to_json())
+        self.assertEqual(data["outcomes"], {"Sent": 1})
+        self.assertEqual(data["phases"]["navigation"]["count"], 1)
+        text = metrics.to_prometheus()
+        self.assertIn('whatsapp_sender_phase_seconds_bucket{phase="navigation",le="0.25"} 1', text)
+        self.assertIn('whatsapp_sender_phase_seconds_bucket{phase="navigation",le="+Inf"} 1', text)
+        self.assertIn('whatsapp_sender_outcomes_total{status="Sent"} 1', text)
+
+
+class MetricsExporterTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.metrics = Metrics()
+        self.metrics.record_outcome("Sent")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_file_format_follows_the_extension(self):
+        for name in ("metrics.json", "metrics.prom"):
+            path = os.path.join(self.tempdir, name)
+            MetricsExporter(self.metrics, path=path, interval=60).start().stop()
+            with open(path, encoding="utf-8") as f:
+                body = f.read()
+            if name.endswith(".json"):
+                self.assertEqual(json.loads(body)["outcomes"], {"Sent": 1})
+            else:
+                self.assertIn('whatsapp_sender_outcomes_total{status="Sent"} 1', body)
+            self.assertFalse(os.path.exists(path + ".tmp"))
+
+    def test_http_endpoints(self):
+        exporter = MetricsExporter(self.metrics, port=0).start()
+        try:
+            base_url = f"http://127.0.0.1:{exporter._server.server_address[1]}"
+            with urllib.request.urlopen(base_url + "/metrics", timeout=5) as response:
+                self.assertIn("whatsapp_sender_outcomes_total", response.read().decode("utf-8"))
+            with urllib.request.urlopen(base_url + "/metrics.json", timeout=5) as response:
+                self.assertEqual(json.load(response)["outcomes"], {"Sent": 1})
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(base_url + "/other", timeout=5)
+        finally:
+            exporter.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
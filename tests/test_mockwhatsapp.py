@@ -0,0 +1,96 @@
+"""Offline checks of the sender against the local WhatsApp Web mock.
+
+The browser tests need Chrome and chromedriver and are skipped without them.
+"""
+import shutil
+import tempfile
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+from journal import SUBMITTED
+from mockwhatsapp import MockWhatsAppServer
+from sender import WhatsAppSender, launch_driver
+
+# Short delays keep the browser tests quick
+FAST = {"page_delay": 0, "open_delay": 20, "sent_delay": 20, "delivered_delay": 20}
+
+
+class MockServerTest(unittest.TestCase):
+    def test_serves_the_page_and_counts_loads(self):
+        server = MockWhatsAppServer(language="ar", **FAST).start()
+        try:
+            with urllib.request.urlopen(f"{server.url}send?phone=966512345678") as response:
+                page = response.read().decode("utf-8")
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{server.url}favicon.ico")
+        finally:
+            server.stop()
+        self.assertIn('<html lang="ar">', page)
+        self.assertIn('"fail_rate": 0.0', page)
+        self.assertEqual(server.page_loads, 1)
+
+    def test_rejects_unknown_settings(self):
+        with self.assertRaises(ValueError):
+            MockWhatsAppServer(fail_rat=1)
+
+
+class MockBrowserTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.profile = tempfile.mkdtemp(prefix="mock_profile_")
+        try:
+            cls.driver = launch_driver(None, cls.profile, headless=True)
+        except WebDriverException as e:
+            shutil.rmtree(cls.profile, ignore_errors=True)
+            raise unittest.SkipTest(f"Chrome is not available: {str(e).splitlines()[0]}")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.driver.quit()
+        shutil.rmtree(cls.profile, ignore_errors=True)
+
+    def open(self, status_timeout=5, **config):
+        server = MockWhatsAppServer(**{**FAST, **config}).start()
+        self.addCleanup(server.stop)
+        self.driver.get(server.url)
+        self.assertTrue(self.driver.find_elements(By.ID, "pane-side"))
+        return server, WhatsAppSender(self.driver, base_url=server.url, status_timeout=status_timeout)
+
+    def test_send_resolves_to_delivered(self):
+        _, sender = self.open()
+        self.assertEqual(sender.send("966512345678", "Hello"), "Delivered")
+
+    def test_pipelined_send_is_confirmed_by_check_message_status(self):
+        _, sender = self.open()
+        self.assertEqual(sender.send("966512345678", "Hello", confirm=False), SUBMITTED)
+        self.assertEqual(sender.check_message_status(), "Delivered")
+
+    def test_stuck_message_is_not_sent_within_the_status_timeout(self):
+        _, sender = self.open(status_timeout=2, fail_rate=1)
+        started = time.monotonic()
+        self.assertEqual(sender.send("966512345678", "Hello"), "Not Sent")
+        self.assertLess(time.monotonic() - started, 2 + 3)
+
+    def test_fast_navigation_does_not_reload_the_page(self):
+        server, sender = self.open()
+        for index in range(3):
+            self.assertEqual(sender.send(f"96651234567{index}", f"Hello {index}"), "Delivered")
+        self.assertEqual(server.page_loads, 1)
+
+    def test_attachment_is_uploaded_through_the_file_input(self):
+        _, sender = self.open()
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+            f.write(b"%PDF-1.4\n")
+            f.flush()
+            self.assertEqual(sender.send("966512345678", "Invoice", attachments=[f.name]), "Delivered")
+        messages = [element.text for element in self.driver.find_elements(By.CLASS_NAME, "message-out")]
+        self.assertIn("[1 document] Invoice", messages)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import time
+import unittest
+
+from pacing import AdaptivePacer, FIXED_DELAY, FixedDelay, TokenBucket, make_pacer
+
+
+class MakePacerTest(unittest.TestCase):
+    def test_fixed_delay_does_not_depend_on_rate(self):
+        self.assertEqual(make_pacer("fixed", rate=20).delay, FIXED_DELAY)
+        self.assertEqual(make_pacer("fixed", rate=20, delay=0.5).delay, 0.5)
+
+    def test_modes(self):
+        self.assertIsInstance(make_pacer("adaptive"), AdaptivePacer)
+        self.assertIsInstance(make_pacer("bucket", rate=30), TokenBucket)
+        with self.assertRaises(KeyError):
+            make_pacer("unknown")
+
+    def test_invalid_rate_or_delay(self):
+        with self.assertRaises(ValueError):
+            make_pacer("bucket", rate=0)
+        with self.assertRaises(ValueError):
+            make_pacer("fixed", delay=-1)
+
+
+class FixedDelayTest(unittest.TestCase):
+    def test_first_send_is_immediate_then_waits(self):
+        pacer = FixedDelay(0.2)
+        started = time.monotonic()
+        self.assertTrue(pacer.wait())
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertTrue(pacer.wait())
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+    def test_zero_delay_never_waits(self):
+        pacer = make_pacer("fixed", delay=0)
+        started = time.monotonic()
+        for _ in range(3):
+            self.assertTrue(pacer.wait())
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertEqual(pacer.describe(), "0s between recipients, 0% errors")
+
+    def test_cancelled_wait(self):
+        pacer = FixedDelay(10)
+        pacer.wait()
+        self.assertFalse(pacer.wait(cancelled=lambda: True))
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_rate(self):
+        pacer = TokenBucket(rate=600, jitter=0)
+        started = time.monotonic()
+        pacer.wait()
+        pacer.wait()
+        # The second send waits for a token: 60 / 600 = 0.1 s
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    def test_cancelled_wait(self):
+        pacer = TokenBucket(rate=1, jitter=0)
+        pacer.wait()
+        self.assertFalse(pacer.wait(cancelled=lambda: True))
+
+
+class AdaptivePacerTest(unittest.TestCase):
+    def test_backs_off_and_recovers(self):
+        pacer = AdaptivePacer(rate=20, recovery_streak=3)
+        for _ in range(5):
+            pacer.record(False)
+        self.assertEqual(pacer.rate, 10)
+        for _ in range(3):
+            pacer.record(True)
+        self.assertEqual(pacer.rate, 12.5)
+
+    def test_never_leaves_its_bounds(self):
+        pacer = AdaptivePacer(rate=20, min_rate=5, recovery_streak=1)
+        for _ in range(50):
+            pacer.record(False)
+        self.assertEqual(pacer.rate, 5)
+        for _ in range(50):
+            pacer.record(True)
+        self.assertEqual(pacer.rate, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
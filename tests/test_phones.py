@@ -0,0 +1,54 @@
+import unittest
+
+from phones import DUPLICATE, INVALID, PhoneFilter, normalize_phone
+
+
+class NormalizePhoneTest(unittest.TestCase):
+    def test_international_formats(self):
+        self.assertEqual(normalize_phone("+966 51 234-5678"), "966512345678")
+        self.assertEqual(normalize_phone("00966512345678"), "966512345678")
+        self.assertEqual(normalize_phone("(966) 512345678"), "966512345678")
+
+    def test_excel_numbers(self):
+        self.assertEqual(normalize_phone(966512345678.0), "966512345678")
+        self.assertEqual(normalize_phone("966512345678.0"), "966512345678")
+        self.assertEqual(normalize_phone("9.66512345678e+11"), "966512345678")
+        self.assertIsNone(normalize_phone(9665.5))
+
+    def test_national_numbers_get_the_default_code(self):
+        self.assertEqual(normalize_phone("0512345678", "966"), "966512345678")
+        # Excel drops the trunk 0 of a number stored as a number
+        self.assertEqual(normalize_phone(512345678, "966"), "966512345678")
+        self.assertEqual(normalize_phone("07911 123456", "44"), "447911123456")
+
+    def test_international_numbers_without_plus_are_kept(self):
+        self.assertEqual(normalize_phone("14155552671", "966"), "14155552671")
+        self.assertEqual(normalize_phone("966512345678", "966"), "966512345678")
+
+    def test_invalid_numbers(self):
+        self.assertIsNone(normalize_phone("12345", "966"))
+        self.assertIsNone(normalize_phone("1234567890123456"))
+        self.assertIsNone(normalize_phone(""))
+        self.assertIsNone(normalize_phone(None))
+
+    def test_arabic_indic_digits(self):
+        self.assertEqual(normalize_phone("٠٥١٢٣٤٥٦٧٨", "966"), "966512345678")
+        self.assertEqual(normalize_phone("+۹۶۶۵۱۲۳۴۵۶۷۸"), "966512345678")
+
+
+class PhoneFilterTest(unittest.TestCase):
+    def test_rejects_invalid_and_duplicate_numbers(self):
+        phones = PhoneFilter("966")
+        self.assertEqual(phones.check("0512345678"), ("966512345678", None))
+        self.assertEqual(phones.check("+966 51 234 5678"), (None, DUPLICATE))
+        self.assertEqual(phones.check("abc"), (None, INVALID))
+        self.assertEqual((phones.invalid, phones.duplicates, phones.removed), (1, 1, 2))
+
+    def test_journaled_numbers_are_not_normalized_again(self):
+        phones = PhoneFilter("44")
+        phones.add_seen("966512345678")
+        self.assertEqual(phones.check("+966512345678"), (None, DUPLICATE))
+
+
+if __name__ == "__main__":
+    unittest.main()
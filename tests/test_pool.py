@@ -0,0 +1,71 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from journal import SUBMITTED, RecipientStatus
+from pool import WorkerPool
+
+
+class StubSender:
+    def __init__(self, driver, **settings):
+        self.driver = driver
+
+    def send(self, phone_number, message, confirm=True, attachments=None):
+        return "Sent" if confirm else SUBMITTED
+
+
+class StubJournal:
+    def __init__(self):
+        self.outcomes = {}
+
+    def record(self, campaign, row_id, phone, message, status):
+        self.outcomes[row_id] = status
+
+    def checkpoint(self, campaign, row_id, offset=None, fingerprint=None):
+        pass
+
+
+class WorkerPoolTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch("pool.WhatsAppSender", StubSender)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.journal = StubJournal()
+        self.pool = WorkerPool(None, 2, self.journal)
+        for worker in self.pool.workers:
+            worker.driver = object()
+        self.recipients = RecipientStatus()
+
+    def start(self, count, **kwargs):
+        rows = [(row_id, (f"96651234{row_id:04d}", "Hello")) for row_id in range(2, count + 2)]
+        thread = threading.Thread(target=self.pool.run, args=(rows, "campaign", self.recipients, {}),
+                                  kwargs={"pacing": {"mode": "bucket", "rate": 6000, "jitter": 0}, **kwargs})
+        thread.start()
+        return thread
+
+    def test_sends_every_row(self):
+        self.start(10).join(10)
+        self.assertEqual(self.recipients.sent, 10)
+        self.assertEqual(set(self.journal.outcomes), set(range(2, 12)))
+
+    def test_pause_before_run_holds_every_session(self):
+        self.pool.pause(paused=True)
+        thread = self.start(5)
+        time.sleep(1.5)
+        self.assertEqual(self.recipients.sent, 0)
+        self.pool.pause(paused=False)
+        thread.join(10)
+        self.assertEqual(self.recipients.sent, 5)
+
+    def test_submitted_sends_are_paced_on_their_verified_outcome_only(self):
+        worker = self.pool.workers[0]
+        self.pool.campaign, self.pool.recipients = "campaign", self.recipients
+        worker.pacer = mock.Mock()
+        worker.record(2, "966512340002", "Hello", SUBMITTED)
+        worker.record(2, "966512340002", "Hello", "Delivered")
+        worker.pacer.record.assert_called_once_with(True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from journal import ResultJournal, campaign_id
+from pool import WorkerPool
+from scheduler import CANCELLED, DONE, QUEUED, RUNNING, STALE_SECONDS, CampaignQueue, Scheduler, SendWindow
+from tests.test_pool import StubSender
+
+
+class SendWindowTest(unittest.TestCase):
+    def test_daytime_window(self):
+        window = SendWindow.parse("09:00-21:00")
+        self.assertTrue(window.is_open(datetime(2024, 5, 1, 9, 0)))
+        self.assertFalse(window.is_open(datetime(2024, 5, 1, 21, 0)))
+        self.assertFalse(window.is_open(datetime(2024, 5, 1, 3, 0)))
+        self.assertEqual(str(window), "09:00-21:00")
+
+    def test_window_past_midnight(self):
+        window = SendWindow.parse("22:00-06:00")
+        self.assertTrue(window.is_open(datetime(2024, 5, 1, 23, 30)))
+        self.assertTrue(window.is_open(datetime(2024, 5, 1, 5, 59)))
+        self.assertFalse(window.is_open(datetime(2024, 5, 1, 12, 0)))
+
+    def test_invalid_window(self):
+        for text in ("9-5", "09:00", "25:00-26:00"):
+            with self.assertRaises(ValueError):
+                SendWindow.parse(text)
+
+
+class CampaignQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queue = CampaignQueue(os.path.join(self.directory, "journal.db"))
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.directory)
+
+    def test_file_is_queued_once(self):
+        self.queue.add("a.csv")
+        with self.assertRaises(ValueError):
+            self.queue.add("a.csv")
+
+    def test_rate_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            self.queue.add("a.csv", rate=0)
+
+    def test_most_urgent_eligible_job_is_picked(self):
+        low = self.queue.add("low.csv", priority=1)
+        high = self.queue.add("high.csv", priority=5, window="00:00-00:01")
+        scheduler = Scheduler(None, None, self.queue)
+        self.assertEqual(scheduler.pick(datetime(2024, 5, 1, 0, 0)).id, high)
+        # Outside its window the urgent job waits
+        self.assertEqual(scheduler.pick(datetime(2024, 5, 1, 12, 0)).id, low)
+
+    def test_cancel_is_not_overwritten_at_the_end_of_a_run(self):
+        job_id = self.queue.add("a.csv")
+        self.queue.update(job_id, state=RUNNING)
+        self.assertTrue(self.queue.cancel(job_id))
+        self.assertFalse(self.queue.update(job_id, from_state=RUNNING, state=DONE))
+        self.assertEqual(self.queue.get(job_id).state, CANCELLED)
+
+    def test_a_job_is_claimed_once(self):
+        job_id = self.queue.add("a.csv")
+        self.assertTrue(self.queue.claim(job_id, "first"))
+        self.assertFalse(self.queue.claim(job_id, "second"))
+        self.assertEqual(self.queue.get(job_id).owner, "first")
+
+    def test_release_only_by_the_owner(self):
+        job_id = self.queue.add("a.csv")
+        self.queue.claim(job_id, "first")
+        self.assertFalse(self.queue.heartbeat(job_id, "second"))
+        self.assertFalse(self.queue.release(job_id, "second", state=DONE))
+        self.assertTrue(self.queue.heartbeat(job_id, "first"))
+        self.assertTrue(self.queue.release(job_id, "first", state=DONE))
+        job = self.queue.get(job_id)
+        self.assertEqual((job.state, job.owner), (DONE, None))
+
+    def test_recover_requeues_only_stale_running_jobs(self):
+        stale_id = self.queue.add("a.csv")
+        fresh_id = self.queue.add("b.csv")
+        self.queue.claim(stale_id, "dead")
+        self.queue.claim(fresh_id, "alive")
+        self.queue.update(stale_id, last_run_at=time.time() - STALE_SECONDS - 1)
+        self.queue.recover()
+        stale, fresh = self.queue.get(stale_id), self.queue.get(fresh_id)
+        self.assertEqual((stale.state, stale.resume, stale.owner), (QUEUED, True, None))
+        self.assertEqual((fresh.state, fresh.owner), (RUNNING, "alive"))
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch("pool.WhatsAppSender", StubSender)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.journal = ResultJournal(self.path("journal.db"))
+        self.queue = CampaignQueue(self.journal.path)
+        self.pool = WorkerPool(None, 2, self.journal)
+        self.scheduler = Scheduler(self.pool, self.journal, self.queue, output_dir=self.directory, poll_interval=0.1)
+
+    def tearDown(self):
+        self.queue.close()
+        self.journal.close()
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_job_finishes_while_a_session_is_dead(self):
+        with open(self.path("contacts.csv"), "w", encoding="utf-8") as f:
+            f.write("Phone,Message\n" + "".join(f"96651234{row_id:04d},Hello\n" for row_id in range(2, 7)))
+        job_id = self.queue.add(self.path("contacts.csv"), rate=6000, settings={"pacing": "bucket"})
+        self.pool.workers[0].driver = object()
+        self.pool.workers[1].state = "dead"
+        thread = threading.Thread(target=self.scheduler.run_job, args=(self.queue.get(job_id),), daemon=True)
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.queue.get(job_id).state, DONE)
+        self.assertEqual(len(list(self.journal.outcomes(campaign_id(self.path("contacts.csv"))))), 5)
+
+    def running_job(self, filepath, priority=0, window=None):
+        job_id = self.queue.add(filepath, priority, window)
+        self.queue.claim(job_id, self.scheduler.owner)
+        return self.queue.get(job_id)
+
+    def should_yield(self, job, started=None):
+        with mock.patch("scheduler.datetime", wraps=datetime) as clock:
+            clock.now.return_value = datetime(2024, 5, 1, 12, 0)
+            return self.scheduler.should_yield(job, time.monotonic() if started is None else started)
+
+    def test_keeps_running_without_a_reason(self):
+        job = self.running_job("a.csv", window="09:00-21:00")
+        self.queue.add("b.csv")
+        self.assertIsNone(self.should_yield(job))
+
+    def test_yields_to_a_higher_priority(self):
+        job = self.running_job("a.csv")
+        urgent_id = self.queue.add("b.csv", priority=5)
+        self.assertEqual(self.should_yield(job), f"pre-empted by #{urgent_id} (priority 5)")
+
+    def test_higher_priority_outside_its_window_does_not_preempt(self):
+        job = self.running_job("a.csv")
+        self.queue.add("b.csv", priority=5, window="22:00-06:00")
+        self.assertIsNone(self.should_yield(job))
+
+    def test_yields_when_the_window_closes(self):
+        job = self.running_job("a.csv", window="09:00-11:00")
+        self.assertEqual(self.should_yield(job), "send window 09:00-11:00 closed")
+
+    def test_yields_after_its_turn_to_an_equal_priority(self):
+        self.scheduler.slice_minutes = 1
+        job = self.running_job("a.csv")
+        self.assertIsNone(self.should_yield(job, time.monotonic() - 61))
+        self.queue.add("b.csv")
+        self.assertIsNone(self.should_yield(job))
+        self.assertEqual(self.should_yield(job, time.monotonic() - 61), "1 minute turn used up")
+
+    def test_yields_when_cancelled_or_taken_over(self):
+        job = self.running_job("a.csv")
+        self.queue.update(job.id, owner="someone else")
+        self.assertEqual(self.should_yield(job), "taken over by another scheduler")
+        self.queue.cancel(job.id)
+        self.assertEqual(self.should_yield(job), "cancelled")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from engine import Campaign
+from journal import ResultJournal
+from templates import MessageTemplate, TemplateError
+
+
+class MessageTemplateTest(unittest.TestCase):
+    def render(self, text, header, values):
+        return MessageTemplate(text).compile(header)(values)
+
+    def test_plain_placeholders(self):
+        self.assertEqual(self.render("Hi {name}, {count} items", ["name", "count"], ("Sara", 5.0)),
+                         "Hi Sara, 5 items")
+
+    def test_date_spec_on_text_and_datetime_cells(self):
+        header = ["due"]
+        self.assertEqual(self.render("{due:%d/%m/%Y}", header, ("2024-05-01",)), "01/05/2024")
+        self.assertEqual(self.render("{due:%d/%m/%Y}", header, (datetime(2024, 5, 1),)), "01/05/2024")
+
+    def test_number_specs_on_text_cells(self):
+        header = ["amount", "count", "share"]
+        values = ("1234.5", "3", "0.25")
+        self.assertEqual(self.render("{amount:,.2f} {count:d} {share:.0%}", header, values), "1,234.50 3 25%")
+        self.assertEqual(self.render("{count:03d}", header, ("", 3.0, "")), "003")
+
+    def test_string_specs_are_left_to_strings(self):
+        self.assertEqual(self.render("[{name:>5}] {name:.2}", ["name"], ("abc",)), "[  abc] ab")
+
+    def test_empty_cells_render_empty(self):
+        self.assertEqual(self.render("due {due:%d/%m/%Y}", ["due"], ("",)), "due ")
+        self.assertEqual(self.render("due {due:%d/%m/%Y}", ["due"], ()), "due ")
+
+    def test_unformattable_value_names_the_placeholder(self):
+        with self.assertRaisesRegex(TemplateError, "due"):
+            self.render("{due:%d/%m/%Y}", ["due"], ("01/05/2024",))
+
+    def test_missing_and_blank_fields(self):
+        template = MessageTemplate("{name} {city}")
+        with self.assertRaises(TemplateError):
+            template.compile(["name"])
+        self.assertEqual(template.blank_fields(["name", "city"], ("Sara", "")), ["city"])
+
+    def test_unsupported_placeholders(self):
+        for text in ("{}", "{name!r}", "{name"):
+            with self.assertRaises(TemplateError):
+                MessageTemplate(text)
+
+
+class ValidateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.journal = ResultJournal(os.path.join(self.directory, "journal.db"))
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.directory)
+
+    def campaign(self, rows, text):
+        path = os.path.join(self.directory, "contacts.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Phone,due\n" + "".join(f"{phone},{due}\n" for phone, due in rows))
+        return Campaign(path, self.journal, template=MessageTemplate(text))
+
+    def test_first_row_is_rendered(self):
+        campaign = self.campaign([("966512345678", "01/05/2024")], "Pay by {due:%d/%m/%Y}")
+        with self.assertRaisesRegex(TemplateError, "Row 2"):
+            campaign.validate()
+
+    def test_scan_counts_rows_that_cannot_be_rendered(self):
+        rows = [("966512345671", "2024-05-01"), ("966512345672", "01/05/2024"), ("966512345673", "")]
+        campaign = self.campaign(rows, "Pay by {due:%d/%m/%Y}")
+        self.assertEqual(campaign.validate(), 0)
+        campaign.close_source()
+        # One row cannot be rendered and one has an empty field
+        self.assertEqual(campaign.validate(scan_rows=True), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
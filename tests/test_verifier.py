@@ -0,0 +1,74 @@
+import unittest
+from unittest import mock
+
+from verifier import DeliveryVerifier
+
+
+class FakeSender:
+    """Serves data-icons per phone number; None means the chat never opens."""
+
+    def __init__(self, icons):
+        self.icons = icons
+        self.current = None
+
+    def open_chat(self, phone_number):
+        if self.icons.get(phone_number) is None:
+            return None
+        self.current = phone_number
+        return object()
+
+    def read_status(self):
+        icon = self.icons[self.current]
+        if isinstance(icon, Exception):
+            raise icon
+        return icon
+
+
+class DeliveryVerifierTest(unittest.TestCase):
+    def make(self, icons, **kwargs):
+        self.recorded = []
+        return DeliveryVerifier(FakeSender(icons), lambda *outcome: self.recorded.append(outcome), **kwargs)
+
+    def test_due_after_batch_size(self):
+        verifier = self.make({}, batch_size=2)
+        verifier.submit(2, "966512345672", "a")
+        self.assertFalse(verifier.due())
+        verifier.submit(3, "966512345673", "b")
+        self.assertTrue(verifier.due())
+
+    def test_resolved_icons_are_recorded(self):
+        verifier = self.make({"966512345672": "msg-dblcheck", "966512345673": "msg-time"})
+        verifier.submit(2, "966512345672", "a")
+        verifier.submit(3, "966512345673", "b")
+        verifier.verify_batch()
+        self.assertEqual(self.recorded, [(2, "966512345672", "a", "Delivered")])
+        self.assertEqual([entry[0] for entry in verifier.pending], [3])
+
+    def test_not_sent_after_deadline(self):
+        verifier = self.make({"966512345672": "msg-time"}, deadline=60)
+        with mock.patch("verifier.time.time", return_value=1000):
+            verifier.submit(2, "966512345672", "a")
+        with mock.patch("verifier.time.time", return_value=1061):
+            verifier.verify_batch()
+        self.assertEqual(self.recorded, [(2, "966512345672", "a", "Not Sent")])
+        self.assertFalse(verifier.pending)
+
+    def test_unopened_chat_waits_for_deadline(self):
+        verifier = self.make({}, deadline=60)
+        verifier.submit(2, "966512345672", "a")
+        verifier.verify_batch()
+        self.assertEqual(self.recorded, [])
+        self.assertEqual(len(verifier.pending), 1)
+
+    def test_error_keeps_message_queued(self):
+        verifier = self.make({"966512345672": RuntimeError("driver gone"), "966512345673": "msg-check"})
+        verifier.submit(2, "966512345672", "a")
+        verifier.submit(3, "966512345673", "b")
+        with self.assertRaises(RuntimeError):
+            verifier.verify_batch()
+        self.assertEqual([entry[0] for entry in verifier.pending], [2, 3])
+        self.assertEqual(self.recorded, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
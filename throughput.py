@@ -0,0 +1,223 @@
+"""End-to-end campaign throughput against the local WhatsApp Web mock.
+
+Runs a generated contact list through a WorkerPool for every combination of
+mode and session count and reports messages per minute, per-recipient latency
+percentiles, CPU time and peak memory. Needs Chrome and chromedriver but no
+WhatsApp account or network.
+
+    python throughput.py --contacts 200 --sessions 1 2 4 --modes fast reload fast-pipelined
+    python throughput.py --fail-rate 0.05 --delivered-delay 1500 --json results.json
+
+CPU and memory cover Chrome and chromedriver when psutil is installed, and only
+this process otherwise.
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from benchmark import percentile
+from engine import Campaign
+from journal import ResultJournal
+from mockwhatsapp import DEFAULT_CONFIG, MockWhatsAppServer
+from pool import WorkerPool
+
+
+# Mode name -> (navigation, pipelined)
+MODES = {
+    "fast": ("fast", False),
+    "reload": ("reload", False),
+    "fast-pipelined": ("fast", True),
+    "reload-pipelined": ("reload", True),
+}
+
+
+def write_contacts(path, count):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Phone Number", "Message"])
+        for index in range(count):
+            writer.writerow([f"9665{index:08d}", f"Benchmark message {index}"])
+
+
+class ResourceSampler:
+    """Samples CPU time and resident memory of this process and its children in the background."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak_rss = 0
+        self.cpu_seconds = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._cpu = {}
+        self._baseline = 0
+        try:
+            import psutil
+            self._process = psutil.Process()
+        except ImportError:
+            self._process = None
+
+    @property
+    def scope(self):
+        return "this process and its children" if self._process else "this process only"
+
+    def _sample(self):
+        if self._process is None:
+            import resource
+
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            # ru_maxrss is in kilobytes on Linux
+            self.peak_rss = max(self.peak_rss, usage.ru_maxrss * 1024)
+            self._cpu[os.getpid()] = usage.ru_utime + usage.ru_stime
+            return
+        import psutil
+
+        rss = 0
+        for process in [self._process, *self._process.children(recursive=True)]:
+            try:
+                times = process.cpu_times()
+                rss += process.memory_info().rss
+            except psutil.Error:
+                continue
+            # Keep the last reading of processes that exit before the end of the run
+            self._cpu[process.pid] = times.user + times.system
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._sample()
+        self._baseline = sum(self._cpu.values())
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        self.cpu_seconds = sum(self._cpu.values()) - self._baseline
+
+
+def run_case(args, base_url, contacts_path, mode, sessions):
+    """Send the whole contact file once; returns a result dict for the report."""
+    navigation, pipelined = MODES[mode]
+    workdir = tempfile.mkdtemp(prefix="throughput_")
+    journal = ResultJournal(os.path.join(workdir, "journal.db"))
+    pool = WorkerPool(args.webdriver, sessions, journal, headless=args.headless, profile_root=workdir,
+                      base_url=base_url)
+    sampler = ResourceSampler()
+    latencies = []
+    lock = threading.Lock()
+    seen = set()
+    last_outcome = {}
+    try:
+        failed = pool.open_sessions()
+        if failed:
+            raise RuntimeError(f"Could not launch Chrome: {failed[0].last_error}")
+        for worker in pool.active_workers():
+            if not worker.wait_for_login(30):
+                raise RuntimeError(f"{worker.name} never showed the mock chat list at {base_url}")
+        campaign = Campaign(contacts_path, journal)
+        settings = {
+            "language": "auto",
+            "send_mode": "message",
+            "photo_path": "",
+            "navigation": navigation,
+            "status_timeout": args.status_timeout,
+        }
+
+        def on_outcome(row_id, status):
+            # Latency is the time a session spent on each recipient: the gap since
+            # its previous recipient's first outcome (Submitted, in pipelined mode)
+            now = time.perf_counter()
+            with lock:
+                if row_id in seen:
+                    return
+                seen.add(row_id)
+                thread = threading.get_ident()
+                latencies.append(now - last_outcome.get(thread, started))
+                last_outcome[thread] = now
+
+        sampler.start()
+        started = time.perf_counter()
+        campaign.run(pool, settings, pipelined=pipelined, on_outcome=on_outcome,
+                     pacing={"mode": "bucket", "rate": args.rate, "jitter": 0})
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+    finally:
+        pool.close()
+        journal.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "mode": mode,
+        "sessions": sessions,
+        "sent": campaign.recipients.sent,
+        "failed": campaign.recipients.failed,
+        "seconds": round(elapsed, 2),
+        "messages_per_minute": round(campaign.recipients.sent / elapsed * 60, 1) if elapsed else 0.0,
+        "cpu_seconds": round(sampler.cpu_seconds, 2),
+        "peak_rss_mb": round(sampler.peak_rss / (1024 * 1024), 1),
+        "resource_scope": sampler.scope,
+        "phases": pool.metrics.to_dict()["phases"],
+    }
+    for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+        result[name] = round(percentile(latencies, fraction), 3) if latencies else None
+    return result
+
+
+def print_report(results):
+    print(f"{'mode':>16} {'sess':>4} {'sent':>5} {'fail':>5} {'msg/min':>8} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'cpu s':>7} {'rss MB':>7}")
+    for result in results:
+        latencies = [f"{result[name]:.3f}" if result[name] is not None else "-" for name in ("p50", "p95", "p99")]
+        print(f"{result['mode']:>16} {result['sessions']:>4} {result['sent']:>5} {result['failed']:>5} "
+              f"{result['messages_per_minute']:>8} {latencies[0]:>7} {latencies[1]:>7} {latencies[2]:>7} "
+              f"{result['cpu_seconds']:>7} {result['peak_rss_mb']:>7}")
+    if results:
+        print(f"CPU and memory: {results[0]['resource_scope']}.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--webdriver", help="Path to chromedriver (default: let Selenium locate it)")
+    parser.add_argument("--contacts", type=int, default=100, help="Recipients per run")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2], help="Concurrency levels to run")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--rate", type=float, default=6000, help="Pacing ceiling per session; high to measure raw speed")
+    parser.add_argument("--status-timeout", type=int, default=10)
+    parser.add_argument("--no-headless", dest="headless", action="store_false", help="Show the browser windows")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    for name, default in DEFAULT_CONFIG.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default,
+                            help="Mock WhatsApp Web setting")
+    args = parser.parse_args(argv)
+
+    server = MockWhatsAppServer(**{name: getattr(args, name) for name in DEFAULT_CONFIG}).start()
+    contacts_dir = tempfile.mkdtemp(prefix="throughput_contacts_")
+    contacts_path = os.path.join(contacts_dir, "contacts.csv")
+    write_contacts(contacts_path, args.contacts)
+    results = []
+    try:
+        for mode in args.modes:
+            for sessions in args.sessions:
+                print(f"Running {mode} with {sessions} session(s)...", flush=True)
+                results.append(run_case(args, server.url, contacts_path, mode, sessions))
+    finally:
+        server.stop()
+        shutil.rmtree(contacts_dir, ignore_errors=True)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import collections
+import time
+
+from sender import STATUS_ICONS
+
+
+# Default number of submitted messages collected before a verification pass
+BATCH_SIZE = 10
+
+# Default time a submitted message gets to reach a terminal status before it counts as not sent
+VERIFY_DEADLINE = 120
+
+
+class DeliveryVerifier:
+    """Confirms the final status of pipelined sends in batches.
+
+    WebDriver sessions cannot be driven from two threads, so verification is
+    interleaved on the worker's own browser: after every batch_size submissions
+    the worker revisits those chats (in-app, without reloads) and reads the
+    newest status icon once. By then most messages have already resolved, so
+    nobody waits on delivery ticks between sends.
+    """
+
+    def __init__(self, sender, record, batch_size=BATCH_SIZE, deadline=VERIFY_DEADLINE, log=None):
+        self.sender = sender
+        self.record = record
+        self.batch_size = batch_size
+        self.deadline = deadline
+        self.log = log or (lambda message: None)
+        self.pending = collections.deque()
+
+    def submit(self, row_id, phone_number, message):
+        self.pending.append((row_id, phone_number, message, time.time()))
+
+    def due(self):
+        return len(self.pending) >= self.batch_size
+
+    def verify_batch(self):
+        """Check every pending message once; unresolved ones stay queued until their deadline."""
+        for _ in range(len(self.pending)):
+            row_id, phone_number, message, submitted_at = self.pending.popleft()
+            try:
+                icon = self.sender.read_status() if self.sender.open_chat(phone_number) else None
+            except Exception:
+                # Keep the message for the next pass (possibly on a restarted driver)
+                self.pending.appendleft((row_id, phone_number, message, submitted_at))
+                raise
+            if icon in STATUS_ICONS:
+                status = STATUS_ICONS[icon]
+            elif time.time() - submitted_at > self.deadline:
+                status = "Not Sent"
+            else:
+                self.pending.append((row_id, phone_number, message, submitted_at))
+                continue
+            self.log(f"Verified message/photo to {phone_number}: {status}.")
+            self.record(row_id, phone_number, message, status)
+
+    def drain(self, interval=2):
+        """Verify until nothing is pending; bounded by the per-message deadline."""
+        while self.pending:
+            self.verify_batch()
+            if self.pending:
+                time.sleep(interval)